@@ -19,8 +19,9 @@ from app.models import Product, ImportJob, Webhook, WebhookEvent
 config = context.config
 
 # Interpret the config file for Python logging.
-# This line sets up loggers basically.
-if config.config_file_name is not None:
+# This line sets up loggers basically. Skipped when migrations are run from
+# inside the API process (app.main) so uvicorn's loggers aren't replaced.
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
     fileConfig(config.config_file_name)
 
 # add your model's MetaData object here
@@ -64,6 +65,9 @@ def run_migrations_offline() -> None:
         dialect_opts={"paramstyle": "named"},
         compare_type=True,
         compare_server_default=True,
+        # Commit each revision separately so autocommit blocks (CREATE INDEX
+        # CONCURRENTLY) never have to break out of a multi-revision transaction
+        transaction_per_migration=True,
     )
 
     with context.begin_transaction():
@@ -77,6 +81,9 @@ def do_run_migrations(connection: Connection) -> None:
         target_metadata=target_metadata,
         compare_type=True,
         compare_server_default=True,
+        # Commit each revision separately so autocommit blocks (CREATE INDEX
+        # CONCURRENTLY) never have to break out of a multi-revision transaction
+        transaction_per_migration=True,
     )
 
     with context.begin_transaction():
@@ -9,6 +9,9 @@ from alembic import op
 import sqlalchemy as sa
 from sqlalchemy.dialects import postgresql
 
+from app.migration_helpers import create_index_concurrently
+
+
 # revision identifiers, used by Alembic.
 revision = 'initial_create_tables'
 down_revision = None
@@ -16,7 +19,33 @@ branch_labels = None
 depends_on = None
 
 
+# Fail fast instead of queueing behind (and blocking) application queries
+LOCK_TIMEOUT = "5s"
+
+# (name, table, columns, unique)
+SECONDARY_INDEXES = [
+    ('idx_products_active', 'products', ['active'], False),
+    ('idx_products_name', 'products', ['name'], False),
+    ('idx_products_sku_ci', 'products', ['sku_ci'], True),
+    ('ix_products_created_at', 'products', ['created_at'], False),
+    ('ix_products_id', 'products', ['id'], False),
+    ('idx_import_jobs_status', 'import_jobs', ['status'], False),
+    ('ix_import_jobs_created_at', 'import_jobs', ['created_at'], False),
+    ('ix_import_jobs_id', 'import_jobs', ['id'], False),
+    ('idx_webhooks_enabled', 'webhooks', ['enabled'], False),
+    ('idx_webhooks_event', 'webhooks', ['event'], False),
+    ('ix_webhooks_id', 'webhooks', ['id'], False),
+    ('idx_webhook_events_created_at', 'webhook_events', ['created_at'], False),
+    ('idx_webhook_events_webhook_id', 'webhook_events', ['webhook_id'], False),
+    ('ix_webhook_events_created_at', 'webhook_events', ['created_at'], False),
+    ('ix_webhook_events_id', 'webhook_events', ['id'], False),
+    ('ix_webhook_events_webhook_id', 'webhook_events', ['webhook_id'], False),
+]
+
+
 def upgrade() -> None:
+    op.execute(f"SET lock_timeout = '{LOCK_TIMEOUT}'")
+
     # Create products table
     op.create_table(
         'products',
@@ -31,11 +60,6 @@ def upgrade() -> None:
         sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
         sa.PrimaryKeyConstraint('id')
     )
-    op.create_index('idx_products_active', 'products', ['active'], unique=False)
-    op.create_index('idx_products_name', 'products', ['name'], unique=False)
-    op.create_index('idx_products_sku_ci', 'products', ['sku_ci'], unique=True)
-    op.create_index(op.f('ix_products_created_at'), 'products', ['created_at'], unique=False)
-    op.create_index(op.f('ix_products_id'), 'products', ['id'], unique=False)
 
     # Create import_jobs table
     op.create_table(
@@ -50,9 +74,6 @@ def upgrade() -> None:
         sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
         sa.PrimaryKeyConstraint('id')
     )
-    op.create_index('idx_import_jobs_status', 'import_jobs', ['status'], unique=False)
-    op.create_index(op.f('ix_import_jobs_created_at'), 'import_jobs', ['created_at'], unique=False)
-    op.create_index(op.f('ix_import_jobs_id'), 'import_jobs', ['id'], unique=False)
 
     # Create webhooks table
     op.create_table(
@@ -68,9 +89,6 @@ def upgrade() -> None:
         sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
         sa.PrimaryKeyConstraint('id')
     )
-    op.create_index('idx_webhooks_enabled', 'webhooks', ['enabled'], unique=False)
-    op.create_index('idx_webhooks_event', 'webhooks', ['event'], unique=False)
-    op.create_index(op.f('ix_webhooks_id'), 'webhooks', ['id'], unique=False)
 
     # Create webhook_events table
     op.create_table(
@@ -86,11 +104,15 @@ def upgrade() -> None:
         sa.ForeignKeyConstraint(['webhook_id'], ['webhooks.id'], ondelete='CASCADE'),
         sa.PrimaryKeyConstraint('id')
     )
-    op.create_index('idx_webhook_events_created_at', 'webhook_events', ['created_at'], unique=False)
-    op.create_index('idx_webhook_events_webhook_id', 'webhook_events', ['webhook_id'], unique=False)
-    op.create_index(op.f('ix_webhook_events_created_at'), 'webhook_events', ['created_at'], unique=False)
-    op.create_index(op.f('ix_webhook_events_id'), 'webhook_events', ['id'], unique=False)
-    op.create_index(op.f('ix_webhook_events_webhook_id'), 'webhook_events', ['webhook_id'], unique=False)
+
+    # Secondary indexes are built CONCURRENTLY outside the table-creation
+    # transaction so replaying this revision against a populated schema only
+    # takes short catalog locks instead of blocking writes for the whole build;
+    # any left INVALID by an earlier failed build are rebuilt
+    with op.get_context().autocommit_block():
+        op.execute(f"SET lock_timeout = '{LOCK_TIMEOUT}'")
+        for index_name, table_name, columns, unique in SECONDARY_INDEXES:
+            create_index_concurrently(index_name, table_name, columns, unique=unique)
 
 
 def downgrade() -> None:
@@ -0,0 +1,55 @@
+"""Replace sku_ci with functional lower(sku) index
+
+Revision ID: 407234ba2781
+Revises: b74aa5bd31f6
+Create Date: 2026-10-15 07:01:00.593315
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.migration_helpers import create_index_concurrently, index_is_valid
+
+
+# revision identifiers, used by Alembic.
+revision = '407234ba2781'
+down_revision = 'b74aa5bd31f6'
+branch_labels = None
+depends_on = None
+
+
+def _build_sku_lower_index() -> None:
+    create_index_concurrently('idx_products_sku_lower', 'products', [sa.text('lower(sku)')], unique=True)
+
+
+def upgrade() -> None:
+    # Case-insensitive uniqueness now comes from an expression index, so the
+    # duplicated lowercase copy of every SKU no longer has to be written
+    with op.get_context().autocommit_block():
+        op.execute("SET lock_timeout = '5s'")
+        _build_sku_lower_index()
+        # idx_products_sku_ci is the only thing enforcing uniqueness (and the
+        # ON CONFLICT arbiter) until the new index is valid, so never drop it
+        # on the strength of an invalid leftover
+        if not index_is_valid('idx_products_sku_lower'):
+            _build_sku_lower_index()
+        if not index_is_valid('idx_products_sku_lower'):
+            raise RuntimeError("idx_products_sku_lower could not be built; keeping idx_products_sku_ci")
+        op.drop_index('idx_products_sku_ci', table_name='products', postgresql_concurrently=True)
+
+    op.execute("SET lock_timeout = '5s'")
+    op.drop_column('products', 'sku_ci')
+
+
+def downgrade() -> None:
+    op.execute("SET lock_timeout = '5s'")
+    op.add_column('products', sa.Column('sku_ci', sa.String(length=255), nullable=True))
+    op.execute("UPDATE products SET sku_ci = lower(sku)")
+    op.alter_column('products', 'sku_ci', nullable=False)
+
+    with op.get_context().autocommit_block():
+        op.execute("SET lock_timeout = '5s'")
+        create_index_concurrently('idx_products_sku_ci', 'products', ['sku_ci'], unique=True)
+        if not index_is_valid('idx_products_sku_ci'):
+            raise RuntimeError("idx_products_sku_ci could not be built; keeping idx_products_sku_lower")
+        op.drop_index('idx_products_sku_lower', table_name='products', postgresql_concurrently=True)
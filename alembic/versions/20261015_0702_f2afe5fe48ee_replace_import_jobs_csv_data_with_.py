@@ -0,0 +1,28 @@
+"""Replace import_jobs csv_data with storage_key
+
+Revision ID: f2afe5fe48ee
+Revises: 407234ba2781
+Create Date: 2026-10-15 07:02:26.305349
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2afe5fe48ee'
+down_revision = '407234ba2781'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Uploaded CSVs are staged in Redis / a shared volume (app.storage) instead
+    # of being copied through the WAL into a TEXT column
+    op.add_column('import_jobs', sa.Column('storage_key', sa.String(length=1024), nullable=True))
+    op.drop_column('import_jobs', 'csv_data')
+
+
+def downgrade() -> None:
+    op.add_column('import_jobs', sa.Column('csv_data', sa.Text(), nullable=True))
+    op.drop_column('import_jobs', 'storage_key')
@@ -0,0 +1,35 @@
+"""Add jsonb_path_ops GIN index on webhook_events payload
+
+Revision ID: 4012d284b30d
+Revises: 4b60c478a770
+Create Date: 2026-10-15 07:05:37.918735
+
+"""
+from alembic import op
+
+from app.migration_helpers import create_index_concurrently
+
+
+# revision identifiers, used by Alembic.
+revision = '4012d284b30d'
+down_revision = '4b60c478a770'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # jsonb_path_ops only supports containment (@>), which is all payload
+    # lookups use, and is much smaller than the default jsonb_ops opclass
+    with op.get_context().autocommit_block():
+        op.execute("SET lock_timeout = '5s'")
+        create_index_concurrently(
+            'idx_webhook_events_payload',
+            'webhook_events',
+            ['payload'],
+            postgresql_using='gin',
+            postgresql_ops={'payload': 'jsonb_path_ops'},
+        )
+
+
+def downgrade() -> None:
+    op.drop_index('idx_webhook_events_payload', table_name='webhook_events')
@@ -0,0 +1,43 @@
+"""Add composite import_jobs and partial webhooks indexes
+
+Revision ID: 4b60c478a770
+Revises: 77dfef792917
+Create Date: 2026-10-15 07:05:24.327484
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.migration_helpers import create_index_concurrently
+
+
+# revision identifiers, used by Alembic.
+revision = '4b60c478a770'
+down_revision = '77dfef792917'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("SET lock_timeout = '5s'")
+        # Jobs dashboard: filter by status, newest first
+        create_index_concurrently(
+            'idx_import_jobs_status_created',
+            'import_jobs',
+            ['status', sa.text('created_at DESC')],
+        )
+        # Webhook dispatch only ever looks up enabled webhooks by event
+        create_index_concurrently(
+            'idx_webhooks_event_enabled',
+            'webhooks',
+            ['event'],
+            postgresql_where=sa.text('enabled = true'),
+        )
+        op.drop_index('idx_webhooks_enabled', table_name='webhooks', postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    op.create_index('idx_webhooks_enabled', 'webhooks', ['enabled'], unique=False)
+    op.drop_index('idx_webhooks_event_enabled', table_name='webhooks')
+    op.drop_index('idx_import_jobs_status_created', table_name='import_jobs')
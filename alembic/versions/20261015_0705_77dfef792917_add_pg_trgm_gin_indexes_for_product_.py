@@ -0,0 +1,47 @@
+"""Add pg_trgm GIN indexes for product search
+
+Revision ID: 77dfef792917
+Revises: f2afe5fe48ee
+Create Date: 2026-10-15 07:05:00.997211
+
+"""
+from alembic import op
+
+from app.migration_helpers import create_index_concurrently
+
+
+# revision identifiers, used by Alembic.
+revision = '77dfef792917'
+down_revision = 'f2afe5fe48ee'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    # list_products searches with ILIKE '%q%'; a leading wildcard can't use a
+    # btree, but a trigram GIN index serves it without a sequential scan
+    with op.get_context().autocommit_block():
+        op.execute("SET lock_timeout = '5s'")
+        create_index_concurrently(
+            'idx_products_name_trgm',
+            'products',
+            ['name'],
+            postgresql_using='gin',
+            postgresql_ops={'name': 'gin_trgm_ops'},
+        )
+        create_index_concurrently(
+            'idx_products_description_trgm',
+            'products',
+            ['description'],
+            postgresql_using='gin',
+            postgresql_ops={'description': 'gin_trgm_ops'},
+        )
+        op.drop_index('idx_products_name', table_name='products', postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    op.create_index('idx_products_name', 'products', ['name'], unique=False)
+    op.drop_index('idx_products_description_trgm', table_name='products')
+    op.drop_index('idx_products_name_trgm', table_name='products')
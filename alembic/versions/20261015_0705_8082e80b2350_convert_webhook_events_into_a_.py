@@ -0,0 +1,74 @@
+"""Convert webhook_events into a TimescaleDB hypertable
+
+Revision ID: 8082e80b2350
+Revises: 4012d284b30d
+Create Date: 2026-10-15 07:05:50.858877
+
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8082e80b2350'
+down_revision = '4012d284b30d'
+branch_labels = None
+depends_on = None
+
+
+def _timescaledb_available() -> bool:
+    """TimescaleDB must be installed and preloaded; stock Postgres has neither"""
+    if context.is_offline_mode():
+        return False
+    return bool(op.get_bind().execute(sa.text(
+        "SELECT EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'timescaledb') "
+        "AND position('timescaledb' in current_setting('shared_preload_libraries')) > 0"
+    )).scalar())
+
+
+def _is_hypertable() -> bool:
+    if context.is_offline_mode():
+        return False
+    return bool(op.get_bind().execute(sa.text(
+        "SELECT EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'timescaledb') "
+        "AND to_regclass('timescaledb_information.hypertables') IS NOT NULL"
+    )).scalar()) and bool(op.get_bind().execute(sa.text(
+        "SELECT EXISTS (SELECT 1 FROM timescaledb_information.hypertables "
+        "WHERE hypertable_name = 'webhook_events')"
+    )).scalar())
+
+
+def upgrade() -> None:
+    op.execute("SET lock_timeout = '5s'")
+
+    # Hypertables require the partitioning column in every unique constraint
+    op.drop_constraint('webhook_events_pkey', 'webhook_events', type_='primary')
+    op.create_primary_key('webhook_events_pkey', 'webhook_events', ['id', 'created_at'])
+
+    if not _timescaledb_available():
+        # Plain Postgres: webhook_events stays a regular table
+        return
+
+    op.execute("CREATE EXTENSION IF NOT EXISTS timescaledb")
+    # Weekly chunks keep recent-window queries on small chunks; expired chunks
+    # are dropped whole instead of DELETE + VACUUM. idx_webhook_events_created_at
+    # already exists, so skip Timescale's default time index.
+    op.execute(
+        "SELECT create_hypertable('webhook_events', 'created_at', "
+        "chunk_time_interval => INTERVAL '7 days', migrate_data => true, "
+        "create_default_indexes => false, if_not_exists => true)"
+    )
+    op.execute(
+        "SELECT add_retention_policy('webhook_events', INTERVAL '90 days', if_not_exists => true)"
+    )
+
+
+def downgrade() -> None:
+    if _is_hypertable():
+        # A hypertable can't be converted back in place (and can't carry an
+        # id-only primary key), so only the retention policy is removed
+        op.execute("SELECT remove_retention_policy('webhook_events', if_exists => true)")
+        return
+
+    op.drop_constraint('webhook_events_pkey', 'webhook_events', type_='primary')
+    op.create_primary_key('webhook_events_pkey', 'webhook_events', ['id'])
@@ -0,0 +1,38 @@
+"""Add partial index for active import jobs
+
+Revision ID: 7acee9854242
+Revises: eb7d011f684c
+Create Date: 2026-10-15 07:11:36.387480
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.migration_helpers import create_index_concurrently
+
+
+# revision identifiers, used by Alembic.
+revision = '7acee9854242'
+down_revision = 'eb7d011f684c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("SET lock_timeout = '5s'")
+        # Only queued/running jobs are polled; keep that index tiny instead of
+        # indexing every historical completed job
+        create_index_concurrently(
+            'idx_import_jobs_active',
+            'import_jobs',
+            [sa.text('created_at DESC')],
+            postgresql_where=sa.text("status IN ('queued', 'running')"),
+        )
+        # Status lookups are served by idx_import_jobs_status_created
+        op.drop_index('idx_import_jobs_status', table_name='import_jobs', postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    op.create_index('idx_import_jobs_status', 'import_jobs', ['status'], unique=False)
+    op.drop_index('idx_import_jobs_active', table_name='import_jobs')
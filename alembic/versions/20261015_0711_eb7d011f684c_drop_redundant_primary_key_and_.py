@@ -0,0 +1,50 @@
+"""Drop redundant primary key and duplicate indexes
+
+Revision ID: eb7d011f684c
+Revises: 8082e80b2350
+Create Date: 2026-10-15 07:11:04.608268
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'eb7d011f684c'
+down_revision = '8082e80b2350'
+branch_labels = None
+depends_on = None
+
+
+# Plain btrees on primary key columns (the PK index already covers them)
+REDUNDANT_PK_INDEXES = [
+    ('ix_products_id', 'products'),
+    ('ix_import_jobs_id', 'import_jobs'),
+    ('ix_webhooks_id', 'webhooks'),
+]
+
+# webhook_events may be a hypertable, which doesn't support DROP INDEX
+# CONCURRENTLY; ix_webhook_events_id is covered by the (id, created_at) PK
+# and the other two duplicate idx_webhook_events_webhook_id / _created_at
+REDUNDANT_EVENT_INDEXES = [
+    ('ix_webhook_events_id', ['id']),
+    ('ix_webhook_events_webhook_id', ['webhook_id']),
+    ('ix_webhook_events_created_at', ['created_at']),
+]
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("SET lock_timeout = '5s'")
+        for index_name, table_name in REDUNDANT_PK_INDEXES:
+            op.drop_index(index_name, table_name=table_name, postgresql_concurrently=True, if_exists=True)
+
+    op.execute("SET lock_timeout = '5s'")
+    for index_name, _ in REDUNDANT_EVENT_INDEXES:
+        op.drop_index(index_name, table_name='webhook_events', if_exists=True)
+
+
+def downgrade() -> None:
+    for index_name, columns in REDUNDANT_EVENT_INDEXES:
+        op.create_index(index_name, 'webhook_events', columns, unique=False)
+    for index_name, table_name in REDUNDANT_PK_INDEXES:
+        op.create_index(index_name, table_name, ['id'], unique=False)
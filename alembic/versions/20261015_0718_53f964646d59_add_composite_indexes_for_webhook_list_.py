@@ -0,0 +1,63 @@
+"""Add composite indexes for webhook list and log queries
+
+Revision ID: 53f964646d59
+Revises: 7acee9854242
+Create Date: 2026-10-15 07:18:35.998624
+
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+from app.migration_helpers import create_index_concurrently
+
+
+# revision identifiers, used by Alembic.
+revision = '53f964646d59'
+down_revision = '7acee9854242'
+branch_labels = None
+depends_on = None
+
+
+def _is_hypertable(table_name: str) -> bool:
+    """Hypertables don't support CREATE/DROP INDEX CONCURRENTLY"""
+    if context.is_offline_mode():
+        return False
+    bind = op.get_bind()
+    if bind.execute(sa.text("SELECT to_regclass('timescaledb_information.hypertables')")).scalar() is None:
+        return False
+    return bool(bind.execute(sa.text(
+        "SELECT EXISTS (SELECT 1 FROM timescaledb_information.hypertables WHERE hypertable_name = :name)"
+    ), {"name": table_name}).scalar())
+
+
+def upgrade() -> None:
+    events_is_hypertable = _is_hypertable('webhook_events')
+
+    with op.get_context().autocommit_block():
+        op.execute("SET lock_timeout = '5s'")
+        # list_webhooks: ORDER BY created_at DESC
+        create_index_concurrently(
+            'idx_webhooks_created_at',
+            'webhooks',
+            [sa.text('created_at DESC')],
+        )
+        # get_webhook_logs: WHERE webhook_id = ? ORDER BY created_at DESC LIMIT ?
+        # (also serves every lookup idx_webhook_events_webhook_id did)
+        create_index_concurrently(
+            'idx_webhook_events_webhook_created',
+            'webhook_events',
+            ['webhook_id', sa.text('created_at DESC')],
+            concurrently=not events_is_hypertable,
+        )
+        op.drop_index(
+            'idx_webhook_events_webhook_id',
+            table_name='webhook_events',
+            postgresql_concurrently=not events_is_hypertable,
+            if_exists=True,
+        )
+
+
+def downgrade() -> None:
+    op.create_index('idx_webhook_events_webhook_id', 'webhook_events', ['webhook_id'], unique=False)
+    op.drop_index('idx_webhook_events_webhook_created', table_name='webhook_events')
+    op.drop_index('idx_webhooks_created_at', table_name='webhooks')
@@ -0,0 +1,28 @@
+"""Add skipped_rows to import_jobs
+
+Revision ID: 560ee8957a62
+Revises: 53f964646d59
+Create Date: 2026-10-15 07:31:12.408215
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '560ee8957a62'
+down_revision = '53f964646d59'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Rows the CSV reader drops because their field count doesn't match the
+    # header; a constant default is a catalog-only change, no table rewrite
+    op.execute("SET lock_timeout = '5s'")
+    op.add_column('import_jobs', sa.Column('skipped_rows', sa.Integer(), server_default=sa.text('0'), nullable=True))
+
+
+def downgrade() -> None:
+    op.execute("SET lock_timeout = '5s'")
+    op.drop_column('import_jobs', 'skipped_rows')
@@ -1,7 +1,7 @@
 # app/celery_app.py
 # Celery configuration
 # - Celery app instance
-# - Broker/backend configuration (Redis)
+# - Broker configuration (Redis), optional result backend
 # - Task discovery
 
 import os
@@ -10,7 +10,12 @@ from celery import Celery
 # Get Redis URL from environment
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL", REDIS_URL)
-CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND", REDIS_URL)
+# Tasks are fire-and-forget (progress goes over pub/sub), so no result backend
+# unless one is explicitly configured for inspection
+CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND") or None
+# Webhook deliveries are network-bound; point this at a queue consumed by a
+# high-concurrency thread-pool worker so they don't hold prefork import slots
+CELERY_WEBHOOK_QUEUE = os.getenv("CELERY_WEBHOOK_QUEUE", "celery")
 
 # Create Celery app instance
 celery_app = Celery(
@@ -22,23 +27,35 @@ celery_app = Celery(
 
 # Celery configuration
 celery_app.conf.update(
-    # Serialization
-    task_serializer="json",
-    accept_content=["json"],
-    result_serializer="json",
+    # Serialization (msgpack for smaller broker payloads; json still accepted
+    # so messages enqueued by older producers keep decoding)
+    task_serializer="msgpack",
+    accept_content=["msgpack", "json"],
+    result_serializer="msgpack",
+    result_accept_content=["msgpack", "json"],
     timezone="UTC",
     enable_utc=True,
     
     # Task routing
     task_routes={
+        "app.tasks.send_webhook_task": {"queue": CELERY_WEBHOOK_QUEUE},
+        "app.tasks.send_webhooks_batch_task": {"queue": CELERY_WEBHOOK_QUEUE},
         "app.tasks.*": {"queue": "celery"}
     },
     
+    # Broker connection reuse (publishers keep sockets open between .delay() calls)
+    broker_pool_limit=int(os.getenv("CELERY_BROKER_POOL_LIMIT", "10")),
+    broker_transport_options={
+        "max_connections": int(os.getenv("REDIS_MAX_CONN", "50")),
+        "socket_keepalive": True,
+    },
+    
     # Worker configuration
     worker_prefetch_multiplier=1,
     worker_max_tasks_per_child=1000,
     
-    # Result backend settings
+    # Result backend settings (only used if CELERY_RESULT_BACKEND is set)
+    task_ignore_result=True,
     result_expires=3600,  # 1 hour
     result_persistent=False,
     
@@ -8,7 +8,6 @@
 import os
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import declarative_base
-from sqlalchemy.pool import NullPool
 
 # Get database URL from environment
 DATABASE_URL = os.getenv(
@@ -26,6 +25,20 @@ engine = create_async_engine(
     echo=False,
     future=True,
     pool_pre_ping=True,
+    pool_size=20,  # Connections kept open for request bursts (e.g. UI polling)
+    max_overflow=40,  # Allow more overflow connections
+    pool_recycle=1800,  # Recycle connections after 30 minutes
+    query_cache_size=1200,  # SQLAlchemy compiled-SQL cache shared across requests
+    connect_args={
+        # Per-connection prepared statement caches (asyncpg / SQLAlchemy adapter),
+        # so hot per-ID queries are parsed and planned once per connection
+        "statement_cache_size": 1024,
+        "prepared_statement_cache_size": 1024,
+        "server_settings": {
+            "application_name": "product-importer",
+            "jit": "off",  # JIT compile time dwarfs short OLTP queries
+        },
+    },
 )
 
 # Create async session factory
@@ -37,6 +50,20 @@ AsyncSessionLocal = async_sessionmaker(
     autoflush=False,
 )
 
+async def warm_up_pool(size: int) -> None:
+    """
+    Open `size` pooled connections up front so the first requests after
+    startup don't pay connection setup (TCP, TLS, auth)
+    """
+    connections = []
+    try:
+        for _ in range(size):
+            connections.append(await engine.connect())
+    finally:
+        for connection in connections:
+            await connection.close()
+
+
 # Base class for models
 Base = declarative_base()
 
@@ -5,16 +5,50 @@
 # - CORS configuration
 # - Exception handlers
 
+import asyncio
 import os
 from contextlib import asynccontextmanager
 
+from alembic import command
+from alembic.config import Config
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.responses import JSONResponse, FileResponse
 from fastapi.staticfiles import StaticFiles
 
+from app.db import warm_up_pool
+from app.middleware import UploadSizeLimitMiddleware
+from app.responses import ORJSONResponse
 from app.routers import upload, products, webhooks
+from app.routers.upload import MAX_FILE_SIZE
+from app.utils import progress_batcher
+
+# Database connections opened at startup (0 disables warm-up)
+DB_POOL_WARMUP = int(os.getenv("DB_POOL_WARMUP", "5"))
+
+# Startup migrations: "sync" blocks startup until done, "async" runs them in the
+# background while serving traffic, "skip" leaves them to the deploy entrypoint
+MIGRATION_MODE = os.getenv("MIGRATION_MODE", "skip")
+
+
+def run_migrations() -> None:
+    """Upgrade the database to the latest Alembic revision (blocking)"""
+    config = Config("alembic.ini")
+    config.attributes["configure_logger"] = False  # Keep uvicorn's logging setup
+    command.upgrade(config, "head")
+
+
+async def run_migrations_in_background(app: FastAPI) -> None:
+    """Run migrations off the event loop and record the outcome for /health"""
+    app.state.migration_status = "running"
+    try:
+        await asyncio.to_thread(run_migrations)
+        app.state.migration_status = "completed"
+        print("[FastAPI] Database migrations completed")
+    except Exception as e:
+        app.state.migration_status = "failed"
+        print(f"[FastAPI] Database migrations failed: {e}")
 
 
 @asynccontextmanager
@@ -28,10 +62,32 @@ async def lifespan(app: FastAPI):
     os.makedirs(upload_dir, exist_ok=True)
     print(f"[FastAPI] Upload directory: {upload_dir}")
     
+    # Database migrations (env.py drives its own event loop, so always run in a thread)
+    app.state.migration_status = "n/a"
+    if MIGRATION_MODE == "sync":
+        print("[FastAPI] Running database migrations...")
+        await asyncio.to_thread(run_migrations)
+        app.state.migration_status = "completed"
+    elif MIGRATION_MODE == "async":
+        print("[FastAPI] Running database migrations in background...")
+        app.state.migration_task = asyncio.create_task(run_migrations_in_background(app))
+    
+    # Start batched progress publishing
+    progress_batcher.start()
+    
+    # Prime the database connection pool before taking traffic
+    if DB_POOL_WARMUP > 0:
+        try:
+            await warm_up_pool(DB_POOL_WARMUP)
+            print(f"[FastAPI] Database pool warmed up ({DB_POOL_WARMUP} connections)")
+        except Exception as e:
+            print(f"[FastAPI] Database pool warm-up failed: {e}")
+    
     yield
     
     # Shutdown
     print("[FastAPI] Application shutting down...")
+    await progress_batcher.stop()
 
 
 # Create FastAPI app
@@ -40,6 +96,7 @@ app = FastAPI(
     description="Backend API for importing and managing products from CSV files",
     version="1.0.0",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
     docs_url="/docs",
     redoc_url="/redoc",
 )
@@ -61,6 +118,9 @@ app.add_middleware(
 # Response compression
 app.add_middleware(GZipMiddleware, minimum_size=1000)
 
+# Reject oversized CSV uploads before the multipart body is read
+app.add_middleware(UploadSizeLimitMiddleware, path="/api/upload", max_file_size=MAX_FILE_SIZE)
+
 
 # ============================================================================
 # Include Routers
@@ -81,7 +141,8 @@ async def health_check():
     return {
         "status": "healthy",
         "service": "product-importer",
-        "version": "1.0.0"
+        "version": "1.0.0",
+        "migrations": getattr(app.state, "migration_status", "n/a"),
     }
 
 
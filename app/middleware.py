@@ -0,0 +1,41 @@
+# app/middleware.py
+# ASGI middleware
+# - UploadSizeLimitMiddleware: reject oversized uploads from Content-Length
+#   before FastAPI reads (and spools) the multipart body
+
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.responses import ORJSONResponse
+
+# Allowance for multipart boundaries and part headers on top of the file itself
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+class UploadSizeLimitMiddleware:
+    """
+    Return 413 for POSTs to `path` whose declared Content-Length exceeds the limit
+
+    FastAPI parses File(...) parameters before the handler runs, so a check in
+    the handler only fires after the whole body has been received. Chunked
+    uploads (no Content-Length) pass through to the handler's streaming check.
+    """
+
+    def __init__(self, app: ASGIApp, path: str, max_file_size: int):
+        self.app = app
+        self.path = path
+        self.max_file_size = max_file_size
+        self.max_body_size = max_file_size + MULTIPART_OVERHEAD
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and scope["method"] == "POST" and scope["path"] == self.path:
+            content_length = Headers(scope=scope).get("content-length", "")
+            if content_length.isdigit() and int(content_length) > self.max_body_size:
+                response = ORJSONResponse(
+                    {"detail": f"File too large. Maximum size: {self.max_file_size // (1024*1024)}MB"},
+                    status_code=413,
+                )
+                await response(scope, receive, send)
+                return
+
+        await self.app(scope, receive, send)
@@ -0,0 +1,80 @@
+# app/migration_helpers.py
+# Shared helpers for Alembic revisions
+# - CREATE INDEX CONCURRENTLY that fails (lock_timeout, duplicate key) leaves
+#   an INVALID index behind; a rerun with IF NOT EXISTS would then skip it and
+#   record the revision as applied with an index that is never used
+# - create_index_concurrently() drops such a leftover before building, so a
+#   rerun rebuilds the index instead
+
+from typing import Any, Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+_INDEX_VALIDITY_SQL = sa.text(
+    "SELECT i.indisvalid FROM pg_index i "
+    "JOIN pg_class c ON c.oid = i.indexrelid "
+    "WHERE c.relname = :name"
+)
+
+
+def index_is_valid(index_name: str) -> bool:
+    """
+    Check whether an index exists and is valid
+
+    Args:
+        index_name: Index name
+
+    Returns:
+        True if the index exists and is valid (always True in offline mode)
+    """
+    if context.is_offline_mode():
+        return True
+    return bool(op.get_bind().execute(_INDEX_VALIDITY_SQL, {"name": index_name}).scalar())
+
+
+def drop_invalid_index(index_name: str, concurrently: bool = True) -> None:
+    """
+    Drop an index left INVALID by a failed concurrent build
+
+    Args:
+        index_name: Index name
+        concurrently: Use DROP INDEX CONCURRENTLY (must run in an autocommit block;
+            not supported on hypertables)
+    """
+    if context.is_offline_mode():
+        return
+    validity = op.get_bind().execute(_INDEX_VALIDITY_SQL, {"name": index_name}).scalar()
+    if validity is False:
+        print(f"[Migrations] Dropping invalid index {index_name} left by a failed build")
+        op.execute(f"DROP INDEX {'CONCURRENTLY ' if concurrently else ''}IF EXISTS {index_name}")
+
+
+def create_index_concurrently(
+    index_name: str,
+    table_name: str,
+    columns: Sequence[Union[str, sa.TextClause]],
+    concurrently: bool = True,
+    **kw: Any,
+) -> None:
+    """
+    CREATE INDEX CONCURRENTLY IF NOT EXISTS, rebuilding an invalid leftover
+
+    Must run inside an autocommit block.
+
+    Args:
+        index_name: Index name
+        table_name: Table to index
+        columns: Column names or SQL expressions
+        concurrently: Build without blocking writes (False for hypertables)
+        **kw: Passed through to op.create_index (unique, postgresql_where, ...)
+    """
+    drop_invalid_index(index_name, concurrently=concurrently)
+    op.create_index(
+        index_name,
+        table_name,
+        columns,
+        postgresql_concurrently=concurrently,
+        if_not_exists=True,
+        **kw,
+    )
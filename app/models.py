@@ -14,8 +14,10 @@ from sqlalchemy import (
     Index,
     Integer,
     Numeric,
+    PrimaryKeyConstraint,
     String,
     Text,
+    func,
     text,
 )
 from sqlalchemy.dialects.postgresql import JSONB, UUID
@@ -30,9 +32,8 @@ class Product(Base):
     """
     __tablename__ = "products"
 
-    id = Column(BigInteger, primary_key=True, index=True, autoincrement=True)
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
     sku = Column(String(255), nullable=False)
-    sku_ci = Column(String(255), nullable=False, unique=True, index=True)  # Lowercase SKU for uniqueness
     name = Column(String(1024), nullable=False)
     description = Column(Text, nullable=True)
     price = Column(Numeric(10, 2), nullable=True)
@@ -51,9 +52,21 @@ class Product(Base):
     )
 
     __table_args__ = (
-        Index("idx_products_sku_ci", "sku_ci", unique=True),
+        Index("idx_products_sku_lower", func.lower(sku), unique=True),  # Case-insensitive uniqueness
         Index("idx_products_active", "active"),
-        Index("idx_products_name", "name"),
+        # Trigram indexes serve the ILIKE '%q%' search in list_products
+        Index(
+            "idx_products_name_trgm",
+            "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ),
+        Index(
+            "idx_products_description_trgm",
+            "description",
+            postgresql_using="gin",
+            postgresql_ops={"description": "gin_trgm_ops"},
+        ),
     )
 
     def __repr__(self):
@@ -66,9 +79,9 @@ class ImportJob(Base):
     """
     __tablename__ = "import_jobs"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     filename = Column(String(512), nullable=False)
-    csv_data = Column(Text, nullable=True)  # Store CSV content for worker access
+    storage_key = Column(String(1024), nullable=True)  # Staged CSV location (see app.storage)
     uploader = Column(String(255), nullable=True)  # Future: user who uploaded
     status = Column(
         String(50),
@@ -78,6 +91,7 @@ class ImportJob(Base):
     )  # queued, running, completed, failed
     total_rows = Column(Integer, nullable=True)
     processed_rows = Column(Integer, nullable=True, default=0, server_default=text("0"))
+    skipped_rows = Column(Integer, nullable=True, default=0, server_default=text("0"))  # Malformed CSV rows
     error = Column(Text, nullable=True)
     created_at = Column(
         DateTime(timezone=True),
@@ -87,7 +101,12 @@ class ImportJob(Base):
     )
 
     __table_args__ = (
-        Index("idx_import_jobs_status", "status"),
+        Index("idx_import_jobs_status_created", "status", created_at.desc()),
+        Index(
+            "idx_import_jobs_active",
+            created_at.desc(),
+            postgresql_where=text("status IN ('queued', 'running')"),
+        ),
     )
 
     def __repr__(self):
@@ -100,10 +119,10 @@ class Webhook(Base):
     """
     __tablename__ = "webhooks"
 
-    id = Column(BigInteger, primary_key=True, index=True, autoincrement=True)
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
     name = Column(String(255), nullable=False)
     url = Column(String(2048), nullable=False)
-    event = Column(String(100), nullable=False, index=True)  # product.created, product.updated, product.deleted
+    event = Column(String(100), nullable=False)  # product.created, product.updated, product.deleted
     enabled = Column(Boolean, default=True, nullable=False, server_default=text("true"))
     last_status = Column(Integer, nullable=True)  # HTTP status code of last response
     last_response = Column(Text, nullable=True)  # Last response body
@@ -124,7 +143,8 @@ class Webhook(Base):
 
     __table_args__ = (
         Index("idx_webhooks_event", "event"),
-        Index("idx_webhooks_enabled", "enabled"),
+        Index("idx_webhooks_event_enabled", "event", postgresql_where=text("enabled = true")),
+        Index("idx_webhooks_created_at", created_at.desc()),
     )
 
     def __repr__(self):
@@ -137,8 +157,8 @@ class WebhookEvent(Base):
     """
     __tablename__ = "webhook_events"
 
-    id = Column(BigInteger, primary_key=True, index=True, autoincrement=True)
-    webhook_id = Column(BigInteger, ForeignKey("webhooks.id", ondelete="CASCADE"), nullable=False, index=True)
+    id = Column(BigInteger, autoincrement=True)
+    webhook_id = Column(BigInteger, ForeignKey("webhooks.id", ondelete="CASCADE"), nullable=False)
     event_type = Column(String(100), nullable=False)  # product.created, product.updated, etc.
     payload = Column(JSONB, nullable=True)  # JSON payload sent to webhook
     status = Column(Integer, nullable=True)  # HTTP response status code
@@ -148,15 +168,23 @@ class WebhookEvent(Base):
         DateTime(timezone=True),
         nullable=False,
         server_default=text("now()"),
-        index=True
     )
 
     # Relationship to webhook
     webhook = relationship("Webhook", back_populates="events")
 
     __table_args__ = (
-        Index("idx_webhook_events_webhook_id", "webhook_id"),
+        # created_at is part of the key so the table can be a TimescaleDB
+        # hypertable partitioned on it
+        PrimaryKeyConstraint("id", "created_at"),
+        Index("idx_webhook_events_webhook_created", "webhook_id", created_at.desc()),
         Index("idx_webhook_events_created_at", "created_at"),
+        Index(
+            "idx_webhook_events_payload",
+            "payload",
+            postgresql_using="gin",
+            postgresql_ops={"payload": "jsonb_path_ops"},
+        ),
     )
 
     def __repr__(self):
@@ -0,0 +1,147 @@
+# app/progress.py
+# Batched progress publishing
+# - ProgressBatcher: queues pub/sub messages and flushes them through one
+#   Redis pipeline per interval instead of one PUBLISH round-trip each
+# - ThreadedProgressBatcher: same for sync (Celery) code, flushed by a
+#   background thread so task loops never wait on Redis
+
+import asyncio
+import queue
+import threading
+import time
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+import redis
+import redis.asyncio as aioredis
+
+
+class ProgressBatcher:
+    """
+    Coalesce progress publishes into pipelined Redis flushes
+
+    Messages are queued without waiting on Redis; a background task drains
+    the queue every `interval` seconds, or as soon as `max_batch` messages are
+    waiting, and sends them in a single pipeline round-trip.
+    """
+
+    def __init__(
+        self,
+        get_client: Callable[[], Awaitable[aioredis.Redis]],
+        interval: float = 0.1,
+        max_batch: int = 500,
+    ):
+        self._get_client = get_client
+        self._interval = interval
+        self._max_batch = max_batch
+        self._queue: "asyncio.Queue[Tuple[str, bytes]]" = asyncio.Queue()
+        self._batch_ready = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Start the background flush loop (call from a running event loop)"""
+        if not self.running:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the flush loop and send whatever is still queued"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def publish(self, channel: str, message: bytes) -> None:
+        """Queue a message for the next flush"""
+        self._queue.put_nowait((channel, message))
+        if self._queue.qsize() >= self._max_batch:
+            self._batch_ready.set()
+
+    async def flush(self) -> None:
+        """Send all queued messages, max_batch per pipeline"""
+        while not self._queue.empty():
+            batch: List[Tuple[str, bytes]] = []
+            while len(batch) < self._max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            try:
+                redis_client = await self._get_client()
+                async with redis_client.pipeline(transaction=False) as pipe:
+                    for channel, message in batch:
+                        pipe.publish(channel, message)
+                    await pipe.execute()
+            except Exception as e:
+                print(f"[Redis Pub/Sub] Error flushing {len(batch)} progress updates: {e}")
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._batch_ready.wait(), timeout=self._interval)
+            except asyncio.TimeoutError:
+                pass
+            self._batch_ready.clear()
+            await self.flush()
+
+
+class ThreadedProgressBatcher:
+    """
+    Coalesce progress publishes from sync code into pipelined Redis flushes
+
+    publish() only enqueues; a daemon thread (started lazily, so it is created
+    in the forked worker process) flushes every `interval` seconds. Messages
+    published with flush=True are sent before publish() returns, together with
+    anything still queued, so final statuses go out in order and aren't lost
+    when the process exits.
+    """
+
+    def __init__(
+        self,
+        get_client: Callable[[], redis.Redis],
+        interval: float = 0.1,
+        max_batch: int = 500,
+    ):
+        self._get_client = get_client
+        self._interval = interval
+        self._max_batch = max_batch
+        self._queue: "queue.SimpleQueue[Tuple[str, bytes]]" = queue.SimpleQueue()
+        self._flush_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def publish(self, channel: str, message: bytes, flush: bool = False) -> None:
+        """Queue a message, optionally flushing right away"""
+        self._queue.put((channel, message))
+        if flush:
+            self.flush()
+        elif self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(
+                target=self._run, name="progress-batcher", daemon=True
+            )
+            self._thread.start()
+
+    def flush(self) -> None:
+        """Send all queued messages, max_batch per pipeline"""
+        # One flusher at a time keeps messages in publish order
+        with self._flush_lock:
+            while not self._queue.empty():
+                batch: List[Tuple[str, bytes]] = []
+                while len(batch) < self._max_batch and not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+
+                try:
+                    with self._get_client().pipeline(transaction=False) as pipe:
+                        for channel, message in batch:
+                            pipe.publish(channel, message)
+                        pipe.execute()
+                except Exception as e:
+                    print(f"[Redis Pub/Sub] Error flushing {len(batch)} progress updates: {e}")
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self._interval)
+            self.flush()
@@ -0,0 +1,40 @@
+# app/responses.py
+# Response classes
+# - ORJSONResponse: orjson-encoded JSON, used as the app's default response class
+
+from decimal import Decimal
+from typing import Any
+
+import orjson
+from fastapi.responses import ORJSONResponse as _ORJSONResponse
+
+
+def _orjson_default(obj: Any) -> Any:
+    """Encode types orjson doesn't handle natively"""
+    if isinstance(obj, Decimal):
+        return str(obj)  # Same representation Pydantic uses for Decimal in JSON
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+# Datetimes are rendered by orjson itself; UTC as "Z" (as Pydantic does) and
+# naive values treated as UTC
+RENDER_OPTIONS = (
+    orjson.OPT_NON_STR_KEYS
+    | orjson.OPT_SERIALIZE_NUMPY
+    | orjson.OPT_NAIVE_UTC
+    | orjson.OPT_UTC_Z
+)
+
+
+class ORJSONResponse(_ORJSONResponse):
+    """
+    ORJSONResponse that also accepts Decimal values, so handlers can return
+    raw database rows without a Pydantic/jsonable_encoder pass
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(
+            content,
+            default=_orjson_default,
+            option=RENDER_OPTIONS,
+        )
@@ -7,16 +7,20 @@
 # - DELETE /api/products/{id}: Delete product
 # - DELETE /api/products/bulk: Bulk delete all products
 
+import asyncio
 import math
+import os
 import uuid
 from typing import Optional
 
-from fastapi import APIRouter, HTTPException, Query
-from sqlalchemy import func, select, or_, delete
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import func, select, or_, delete, text
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db import AsyncSessionLocal
+from app.db import get_db
 from app.models import Product
+from app.responses import ORJSONResponse
 from app.schemas import (
     ProductCreate,
     ProductUpdate,
@@ -30,6 +34,22 @@ from app.utils import publish_progress_async
 
 router = APIRouter()
 
+# Unfiltered listings report the planner's row estimate above this table size
+COUNT_ESTIMATE_THRESHOLD = int(os.getenv("PRODUCT_COUNT_ESTIMATE_THRESHOLD", "100000"))
+
+# Columns selected by list_products (the ProductResponse fields)
+PRODUCT_LIST_COLUMNS = (
+    Product.id,
+    Product.sku,
+    Product.name,
+    Product.description,
+    Product.price,
+    Product.active,
+    Product.created_at,
+    Product.updated_at,
+)
+PRODUCT_LIST_FIELDS = tuple(column.key for column in PRODUCT_LIST_COLUMNS)
+
 
 @router.get("/products", response_model=ProductListResponse)
 async def list_products(
@@ -38,6 +58,7 @@ async def list_products(
     sku: Optional[str] = Query(None, description="Filter by SKU (case-insensitive partial match)"),
     q: Optional[str] = Query(None, description="Search in name and description"),
     active: Optional[bool] = Query(None, description="Filter by active status"),
+    session: AsyncSession = Depends(get_db),
 ):
     """
     List products with pagination and filtering
@@ -46,206 +67,228 @@ async def list_products(
     - Filter by SKU (case-insensitive partial match)
     - Search by name/description (case-insensitive partial match)
     - Filter by active status
+    
+    Rows are selected as plain column mappings and encoded straight to JSON,
+    skipping ORM instances and a second Pydantic validation pass per row.
     """
-    async with AsyncSessionLocal() as session:
-        # Build query
-        query = select(Product)
-        
-        # Apply filters
-        if sku:
-            sku_term = f"{sku.lower()}%"  # Starts with (prefix match)
-            query = query.where(Product.sku_ci.like(sku_term))
-        
-        if q:
-            search_term = f"%{q}%"  # Contains anywhere
-            query = query.where(
-                or_(
-                    Product.name.ilike(search_term),
-                    Product.description.ilike(search_term)
-                )
+    # Build query
+    query = select(*PRODUCT_LIST_COLUMNS)
+    
+    # Apply filters
+    if sku:
+        sku_term = f"{sku.lower()}%"  # Starts with (prefix match)
+        query = query.where(func.lower(Product.sku).like(sku_term))
+    
+    if q:
+        search_term = f"%{q}%"  # Contains anywhere
+        query = query.where(
+            or_(
+                Product.name.ilike(search_term),
+                Product.description.ilike(search_term)
             )
-        
-        if active is not None:
-            query = query.where(Product.active == active)
-        
-        # Get total count
-        count_query = select(func.count()).select_from(query.subquery())
-        result = await session.execute(count_query)
-        total = result.scalar()
-        
-        # Apply pagination
-        offset = (page - 1) * page_size
-        query = query.order_by(Product.created_at.desc())
-        query = query.limit(page_size).offset(offset)
-        
-        # Execute query
-        result = await session.execute(query)
-        products = result.scalars().all()
-        
-        # Calculate total pages
-        pages = math.ceil(total / page_size) if total > 0 else 0
-        
-        return ProductListResponse(
-            items=[ProductResponse.model_validate(p) for p in products],
-            total=total,
-            page=page,
-            page_size=page_size,
-            pages=pages
         )
+    
+    if active is not None:
+        query = query.where(Product.active == active)
+    
+    # Apply pagination
+    offset = (page - 1) * page_size
+    page_query = query.order_by(Product.created_at.desc())
+    page_query = page_query.limit(page_size).offset(offset)
+    
+    # Unfiltered listing on a large table: an exact count(*) is a full scan
+    # on every page view, so use the planner's row estimate instead
+    total = None
+    if not sku and not q and active is None:
+        estimate = await session.scalar(
+            text("SELECT reltuples::bigint FROM pg_class WHERE oid = 'products'::regclass")
+        )
+        if estimate is not None and estimate >= COUNT_ESTIMATE_THRESHOLD:
+            total = estimate
+    
+    if total is None:
+        # Fetch the page and the exact match count in one round-trip
+        result = await session.execute(
+            page_query.add_columns(func.count().over().label("total_count"))
+        )
+        rows = result.mappings().all()
+        items = [{field: row[field] for field in PRODUCT_LIST_FIELDS} for row in rows]
+        
+        if rows:
+            total = rows[0]["total_count"]
+        elif offset:
+            # Page past the end returns no rows to carry the window count
+            total = await session.scalar(
+                select(func.count()).select_from(query.subquery())
+            )
+        else:
+            total = 0
+    else:
+        result = await session.execute(page_query)
+        items = [dict(row) for row in result.mappings()]
+    
+    # Calculate total pages
+    pages = math.ceil(total / page_size) if total > 0 else 0
+    
+    return ORJSONResponse({
+        "items": items,
+        "total": total,
+        "page": page,
+        "page_size": page_size,
+        "pages": pages,
+    })
 
 
 @router.get("/products/{product_id}", response_model=ProductResponse)
-async def get_product(product_id: int):
+async def get_product(product_id: int, session: AsyncSession = Depends(get_db)):
     """
     Get single product by ID
     """
-    async with AsyncSessionLocal() as session:
-        result = await session.execute(
-            select(Product).where(Product.id == product_id)
+    result = await session.execute(
+        select(Product).where(Product.id == product_id)
+    )
+    product = result.scalar_one_or_none()
+    
+    if not product:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Product {product_id} not found"
         )
-        product = result.scalar_one_or_none()
-        
-        if not product:
-            raise HTTPException(
-                status_code=404,
-                detail=f"Product {product_id} not found"
-            )
-        
-        return ProductResponse.model_validate(product)
+    
+    return ProductResponse.model_validate(product)
 
 
 @router.post("/products", response_model=ProductResponse, status_code=201)
-async def create_product(product_data: ProductCreate):
+async def create_product(product_data: ProductCreate, session: AsyncSession = Depends(get_db)):
     """
     Create a new product
     
     - SKU must be unique (case-insensitive)
     - Returns created product
     """
-    async with AsyncSessionLocal() as session:
-        try:
-            # Create product with case-insensitive SKU
-            product = Product(
-                sku=product_data.sku,
-                sku_ci=product_data.sku.lower(),
-                name=product_data.name,
-                description=product_data.description,
-                price=product_data.price,
-                active=product_data.active
-            )
-            
-            session.add(product)
-            await session.commit()
-            await session.refresh(product)
-            
-            print(f"[Products] Created product: {product.id} (SKU: {product.sku})")
-            
-            return ProductResponse.model_validate(product)
-            
-        except IntegrityError as e:
-            await session.rollback()
-            
-            # Check if it's a duplicate SKU error
-            if 'sku_ci' in str(e.orig) or 'unique' in str(e.orig).lower():
-                raise HTTPException(
-                    status_code=409,
-                    detail=f"Product with SKU '{product_data.sku}' already exists (case-insensitive)"
-                )
-            
+    try:
+        # Create product with case-insensitive SKU
+        product = Product(
+            sku=product_data.sku,
+            name=product_data.name,
+            description=product_data.description,
+            price=product_data.price,
+            active=product_data.active
+        )
+        
+        session.add(product)
+        await session.commit()
+        await session.refresh(product)
+        
+        print(f"[Products] Created product: {product.id} (SKU: {product.sku})")
+        
+        return ProductResponse.model_validate(product)
+        
+    except IntegrityError as e:
+        await session.rollback()
+        
+        # Check if it's a duplicate SKU error
+        if 'idx_products_sku_lower' in str(e.orig) or 'unique' in str(e.orig).lower():
             raise HTTPException(
-                status_code=400,
-                detail=f"Database error: {str(e.orig)}"
+                status_code=409,
+                detail=f"Product with SKU '{product_data.sku}' already exists (case-insensitive)"
             )
+        
+        raise HTTPException(
+            status_code=400,
+            detail=f"Database error: {str(e.orig)}"
+        )
 
 
 @router.put("/products/{product_id}", response_model=ProductResponse)
-async def update_product(product_id: int, product_data: ProductUpdate):
+async def update_product(
+    product_id: int,
+    product_data: ProductUpdate,
+    session: AsyncSession = Depends(get_db),
+):
     """
     Update existing product
     
     - All fields are optional
     - SKU uniqueness is enforced (case-insensitive)
     """
-    async with AsyncSessionLocal() as session:
-        # Fetch product
-        result = await session.execute(
-            select(Product).where(Product.id == product_id)
+    # Fetch product
+    result = await session.execute(
+        select(Product).where(Product.id == product_id)
+    )
+    product = result.scalar_one_or_none()
+    
+    if not product:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Product {product_id} not found"
         )
-        product = result.scalar_one_or_none()
+    
+    try:
+        # Update fields if provided
+        if product_data.sku is not None:
+            product.sku = product_data.sku
         
-        if not product:
-            raise HTTPException(
-                status_code=404,
-                detail=f"Product {product_id} not found"
-            )
+        if product_data.name is not None:
+            product.name = product_data.name
+        
+        if product_data.description is not None:
+            product.description = product_data.description
+        
+        if product_data.price is not None:
+            product.price = product_data.price
         
-        try:
-            # Update fields if provided
-            if product_data.sku is not None:
-                product.sku = product_data.sku
-                product.sku_ci = product_data.sku.lower()
-            
-            if product_data.name is not None:
-                product.name = product_data.name
-            
-            if product_data.description is not None:
-                product.description = product_data.description
-            
-            if product_data.price is not None:
-                product.price = product_data.price
-            
-            if product_data.active is not None:
-                product.active = product_data.active
-            
-            await session.commit()
-            await session.refresh(product)
-            
-            print(f"[Products] Updated product: {product.id}")
-            
-            return ProductResponse.model_validate(product)
-            
-        except IntegrityError as e:
-            await session.rollback()
-            
-            # Check if it's a duplicate SKU error
-            if 'sku_ci' in str(e.orig) or 'unique' in str(e.orig).lower():
-                raise HTTPException(
-                    status_code=409,
-                    detail=f"Product with SKU '{product_data.sku}' already exists (case-insensitive)"
-                )
-            
+        if product_data.active is not None:
+            product.active = product_data.active
+        
+        await session.commit()
+        await session.refresh(product)
+        
+        print(f"[Products] Updated product: {product.id}")
+        
+        return ProductResponse.model_validate(product)
+        
+    except IntegrityError as e:
+        await session.rollback()
+        
+        # Check if it's a duplicate SKU error
+        if 'idx_products_sku_lower' in str(e.orig) or 'unique' in str(e.orig).lower():
             raise HTTPException(
-                status_code=400,
-                detail=f"Database error: {str(e.orig)}"
+                status_code=409,
+                detail=f"Product with SKU '{product_data.sku}' already exists (case-insensitive)"
             )
+        
+        raise HTTPException(
+            status_code=400,
+            detail=f"Database error: {str(e.orig)}"
+        )
 
 
 @router.delete("/products/{product_id}", response_model=DeleteResponse)
-async def delete_product(product_id: int):
+async def delete_product(product_id: int, session: AsyncSession = Depends(get_db)):
     """
     Delete a product by ID
     """
-    async with AsyncSessionLocal() as session:
-        result = await session.execute(
-            select(Product).where(Product.id == product_id)
-        )
-        product = result.scalar_one_or_none()
-        
-        if not product:
-            raise HTTPException(
-                status_code=404,
-                detail=f"Product {product_id} not found"
-            )
-        
-        await session.delete(product)
-        await session.commit()
-        
-        print(f"[Products] Deleted product: {product_id}")
-        
-        return DeleteResponse(
-            deleted=product_id,
-            message=f"Product {product_id} deleted successfully"
+    result = await session.execute(
+        select(Product).where(Product.id == product_id)
+    )
+    product = result.scalar_one_or_none()
+    
+    if not product:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Product {product_id} not found"
         )
+    
+    await session.delete(product)
+    await session.commit()
+    
+    print(f"[Products] Deleted product: {product_id}")
+    
+    return DeleteResponse(
+        deleted=product_id,
+        message=f"Product {product_id} deleted successfully"
+    )
 
 
 @router.post("/products/bulk-delete", response_model=BulkDeleteResponse, status_code=202)
@@ -267,7 +310,7 @@ async def bulk_delete_products():
     
     # Trigger Celery task
     try:
-        bulk_delete_task.delay(job_id)
+        await asyncio.to_thread(bulk_delete_task.delay, job_id)
         print(f"[Products] Triggered bulk delete task, job_id: {job_id}")
         
     except Exception as e:
@@ -3,36 +3,75 @@
 # - POST /api/upload: Upload CSV and trigger Celery task
 # - GET /api/progress/{task_id}: SSE stream for real-time progress
 
+import asyncio
+import logging
 import os
 import uuid
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Optional
 
-from fastapi import APIRouter, File, HTTPException, UploadFile
+import orjson
+from fastapi import APIRouter, Depends, File, HTTPException, Request, UploadFile
 from fastapi.responses import StreamingResponse
-from sqlalchemy import select
+from sqlalchemy import insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db import AsyncSessionLocal
+from app.db import AsyncSessionLocal, get_db
 from app.models import ImportJob
 from app.schemas import ImportJobResponse, MessageResponse
+from app.services.stream_hub import stream_hub
+from app.storage import delete_csv, save_csv_stream
 from app.tasks import import_csv_task
 from app.utils import get_async_redis
 
 router = APIRouter()
 
+# Per-message SSE logging goes through logging at DEBUG (skipped at the default
+# level) instead of print, which does a blocking write for every message
+logger = logging.getLogger(__name__)
+
 # Configuration
 UPLOAD_DIR = os.getenv("UPLOAD_DIR", "uploads")
 MAX_FILE_SIZE = int(os.getenv("MAX_FILE_SIZE_MB", "100")) * 1024 * 1024  # 100MB default
+UPLOAD_CHUNK_SIZE = 1 << 20  # 1 MiB reads (Starlette already spools uploads >1MB to disk)
+
+# SSE framing
+SSE_PREFIX = b"data: "
+SSE_SUFFIX = b"\n\n"
+SSE_KEEPALIVE = b":keepalive\n\n"
+SSE_HEARTBEAT_INTERVAL = 15  # seconds
+SSE_COALESCE_WINDOW = 0.05  # seconds to gather progress messages into one write
+SSE_COALESCE_MAX_BYTES = 16384
+TERMINAL_STATUSES = frozenset({"complete", "error", "cancelled"})
+TERMINAL_STATUS_MARKERS = tuple(f'"{status}"'.encode() for status in TERMINAL_STATUSES)
+
+# Import job statuses that can no longer be cancelled
+FINISHED_JOB_STATUSES = ("completed", "failed", "cancelled")
+
+
+def _terminal_status(data: bytes) -> Optional[str]:
+    """
+    Return the status if this progress message ends the job, else None
+    (only parses JSON when a terminal status string appears in the message)
+    """
+    if not any(marker in data for marker in TERMINAL_STATUS_MARKERS):
+        return None
+    try:
+        status = orjson.loads(data).get('status')
+    except orjson.JSONDecodeError:
+        return None
+    return status if status in TERMINAL_STATUSES else None
 
 
 @router.post("/upload", response_model=ImportJobResponse, status_code=202)
 async def upload_csv(
-    file: UploadFile = File(..., description="CSV file to import")
+    file: UploadFile = File(..., description="CSV file to import"),
+    session: AsyncSession = Depends(get_db),
 ):
     """
     Upload CSV file and start import task
     
     - Validates file type and size
-    - Saves file to disk
+    - Streams file into CSV staging
     - Creates ImportJob record
     - Triggers Celery background task
     - Returns job ID for progress tracking
@@ -54,12 +93,13 @@ async def upload_csv(
     # Generate unique job ID
     job_id = uuid.uuid4()
     
-    # Read CSV content into memory (for Railway shared access between services)
-    try:
-        total_size = 0
-        csv_content = ""
-        
-        while chunk := await file.read(8192):  # 8KB chunks
+    # Stream the upload straight into staging (Redis or shared volume, not
+    # Postgres) without ever holding the whole file in memory
+    total_size = 0
+    
+    async def upload_chunks():
+        nonlocal total_size
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
             total_size += len(chunk)
             
             # Check file size limit
@@ -69,53 +109,65 @@ async def upload_csv(
                     detail=f"File too large. Maximum size: {MAX_FILE_SIZE // (1024*1024)}MB"
                 )
             
-            csv_content += chunk.decode('utf-8', errors='replace')
-        
-        print(f"[Upload] Read CSV file: {file.filename} ({total_size:,} bytes)")
+            yield chunk
+    
+    try:
+        storage_key = await save_csv_stream(str(job_id), upload_chunks())
+        print(f"[Upload] Staged CSV file: {file.filename} ({total_size:,} bytes)")
         
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
-            detail=f"Failed to read file: {str(e)}"
+            detail=f"Failed to store file: {str(e)}"
         )
     
-    # Create ImportJob record with CSV data
-    async with AsyncSessionLocal() as session:
-        try:
-            import_job = ImportJob(
+    # Create ImportJob record (INSERT ... RETURNING, no refresh round-trip)
+    try:
+        result = await session.execute(
+            insert(ImportJob)
+            .values(
                 id=job_id,
                 filename=file.filename,
-                csv_data=csv_content,  # Store CSV in database
+                storage_key=storage_key,
                 status="queued",
                 total_rows=None,
                 processed_rows=0
             )
-            session.add(import_job)
-            await session.commit()
-            await session.refresh(import_job)
-            
-            print(f"[Upload] Created ImportJob: {job_id}")
-            
-        except Exception as e:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Failed to create import job: {str(e)}"
-            )
+            .returning(ImportJob)
+        )
+        import_job = result.scalar_one()
+        
+        # Commit before enqueueing so the worker is guaranteed to see the job
+        await session.commit()
+        
+        print(f"[Upload] Created ImportJob: {job_id}")
+        
+    except Exception as e:
+        # No job will ever read the staged CSV; local files and S3 objects don't expire
+        await asyncio.to_thread(delete_csv, storage_key)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to create import job: {str(e)}"
+        )
     
-    # Trigger Celery task (pass job_id only, worker will fetch CSV from DB)
+    # Trigger Celery task (worker reads the staged CSV by storage key); the
+    # broker publish is blocking, so keep it off the event loop
     try:
-        import_csv_task.delay(str(job_id))
+        await asyncio.to_thread(import_csv_task.delay, str(job_id), storage_key)
         print(f"[Upload] Triggered import task for job {job_id}")
         
     except Exception as e:
-        # Update job status to failed
-        async with AsyncSessionLocal() as session:
-            import_job.status = "failed"
-            import_job.error = f"Failed to start task: {str(e)}"
-            session.add(import_job)
-            await session.commit()
+        await asyncio.to_thread(delete_csv, storage_key)
+        
+        # Mark job as failed on the same session
+        await session.execute(
+            update(ImportJob)
+            .where(ImportJob.id == job_id)
+            .values(status="failed", error=f"Failed to start task: {str(e)}")
+        )
+        await session.commit()
         
         raise HTTPException(
             status_code=500,
@@ -126,42 +178,31 @@ async def upload_csv(
 
 
 @router.get("/progress/{job_id}")
-async def stream_progress(job_id: str):
+async def stream_progress(request: Request, job_id: uuid.UUID):
     """
     Server-Sent Events endpoint for real-time progress updates
     
-    - Subscribes to Redis pub/sub channel for job
+    - Subscribes to the job's Redis pub/sub channel via the shared StreamHub
     - Streams progress messages as SSE events
+    - Sends keepalive comments while idle and stops when the client disconnects
     - Auto-closes when job completes or errors
     """
-    async def event_generator() -> AsyncGenerator[str, None]:
+    async def event_generator() -> AsyncGenerator[bytes, None]:
         """Generate SSE events from Redis pub/sub"""
-        import redis.asyncio as aioredis
-        import json
-        
-        # Create a new Redis connection for this SSE stream
-        redis_url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
-        redis_client = await aioredis.from_url(
-            redis_url,
-            decode_responses=True,
-            encoding="utf-8"
-        )
-        pubsub = redis_client.pubsub()
-        
+        # Share one Redis subscription per job between all connected clients
         channel = f"job:{job_id}"
-        await pubsub.subscribe(channel)
+        queue = await stream_hub.subscribe(channel)
+        message_count = 0
         
         print(f"[SSE] Client connected to progress stream for job {job_id}")
-        print(f"[SSE] Subscribed to Redis channel: {channel}")
         
         try:
             # Send initial connection message
-            initial_msg = json.dumps({"status": "connected", "job_id": job_id})
-            yield f"data: {initial_msg}\n\n"
+            initial_msg = orjson.dumps({"status": "connected", "job_id": job_id})
+            yield SSE_PREFIX + initial_msg + SSE_SUFFIX
             
             # Check if job already has a status (for fast imports that complete during SSE connection)
-            from app.models import ImportJob
-            from app.db import AsyncSessionLocal
+            # (own short-lived session: the stream outlives any request-scoped one)
             async with AsyncSessionLocal() as db_session:
                 result = await db_session.execute(
                     select(ImportJob).where(ImportJob.id == job_id)
@@ -180,41 +221,67 @@ async def stream_progress(job_id: str):
                     if job.error:
                         final_status["error"] = job.error
                     print(f"[SSE] Job {job_id} already finished with status: {job.status}, sending final status")
-                    yield f"data: {json.dumps(final_status)}\n\n"
+                    yield SSE_PREFIX + orjson.dumps(final_status) + SSE_SUFFIX
                     return
             
-            # Listen for messages
-            message_count = 0
-            async for message in pubsub.listen():
-                print(f"[SSE] Received message type: {message['type']}, data: {message.get('data', 'N/A')}")
+            # Listen for messages; wake up periodically to send a heartbeat and
+            # notice clients that went away between progress updates
+            loop = asyncio.get_running_loop()
+            while True:
+                if await request.is_disconnected():
+                    print(f"[SSE] Client for job {job_id} went away")
+                    break
                 
-                if message['type'] == 'message':
-                    data = message['data']
+                try:
+                    data = await asyncio.wait_for(queue.get(), timeout=SSE_HEARTBEAT_INTERVAL)
+                except asyncio.TimeoutError:
+                    yield SSE_KEEPALIVE
+                    continue
+                
+                # Coalesce messages arriving within a short window into a single
+                # write (raw bytes from Redis, no re-encoding)
+                frames = bytearray()
+                status = None
+                deadline = loop.time() + SSE_COALESCE_WINDOW
+                while data is not None:
                     message_count += 1
-                    print(f"[SSE] Forwarding message #{message_count} to client for job {job_id}")
+                    logger.debug("[SSE] Forwarding message #%d to client for job %s", message_count, job_id)
+                    frames += SSE_PREFIX
+                    frames += data
+                    frames += SSE_SUFFIX
                     
-                    # Forward message to client
-                    yield f"data: {data}\n\n"
+                    status = _terminal_status(data)
+                    if status or len(frames) >= SSE_COALESCE_MAX_BYTES:
+                        break
                     
-                    # Check if job is complete or failed
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
                     try:
-                        msg_data = json.loads(data)
-                        if msg_data.get('status') in ['complete', 'error', 'cancelled']:
-                            print(f"[SSE] Job {job_id} finished with status: {msg_data.get('status')}")
+                        data = queue.get_nowait()
+                    except asyncio.QueueEmpty:
+                        try:
+                            data = await asyncio.wait_for(queue.get(), timeout=remaining)
+                        except asyncio.TimeoutError:
                             break
-                    except json.JSONDecodeError:
-                        pass
+                
+                if frames:
+                    yield bytes(frames)
+                
+                if status:
+                    print(f"[SSE] Job {job_id} finished with status: {status}")
+                    break
+                if data is None:  # Hub lost the Redis subscription
+                    break
                     
         except Exception as e:
             print(f"[SSE] Error in event stream: {e}")
             import traceback
             traceback.print_exc()
-            yield f"data: {{'status': 'error', 'error': '{str(e)}'}}\n\n"
+            yield SSE_PREFIX + orjson.dumps({"status": "error", "error": str(e)}) + SSE_SUFFIX
             
         finally:
-            await pubsub.unsubscribe(channel)
-            await pubsub.close()
-            await redis_client.close()
+            await stream_hub.unsubscribe(channel, queue)
             print(f"[SSE] Client disconnected from job {job_id}, forwarded {message_count} messages")
     
     return StreamingResponse(
@@ -229,70 +296,73 @@ async def stream_progress(job_id: str):
 
 
 @router.get("/jobs/{job_id}", response_model=ImportJobResponse)
-async def get_job_status(job_id: str):
+async def get_job_status(job_id: uuid.UUID, session: AsyncSession = Depends(get_db)):
     """
     Get import job status
     
     - Returns current status of import job
     - Useful for polling-based clients
     """
-    async with AsyncSessionLocal() as session:
-        result = await session.execute(
-            select(ImportJob).where(ImportJob.id == job_id)
+    result = await session.execute(
+        select(ImportJob).where(ImportJob.id == job_id)
+    )
+    job = result.scalar_one_or_none()
+    
+    if not job:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Import job {job_id} not found"
         )
-        job = result.scalar_one_or_none()
-        
-        if not job:
-            raise HTTPException(
-                status_code=404,
-                detail=f"Import job {job_id} not found"
-            )
-        
-        return job
+    
+    return job
 
 
 @router.post("/jobs/{job_id}/cancel", response_model=MessageResponse)
-async def cancel_job(job_id: str):
+async def cancel_job(job_id: uuid.UUID, session: AsyncSession = Depends(get_db)):
     """
     Cancel an import job
     
     - Marks job as cancelled in database
-    - Sets cancellation flag in Redis
-    - Background task will check this flag and stop processing
+    - Sets cancellation flag in Redis and publishes on cancel:{job_id}
+    - Background task is notified (or checks the flag on start) and stops processing
     """
-    async with AsyncSessionLocal() as session:
-        result = await session.execute(
-            select(ImportJob).where(ImportJob.id == job_id)
-        )
-        job = result.scalar_one_or_none()
+    # Single conditional UPDATE ... RETURNING; only look the job up again to
+    # tell "not found" from "already finished" when nothing was updated
+    result = await session.execute(
+        update(ImportJob)
+        .where(ImportJob.id == job_id, ImportJob.status.notin_(FINISHED_JOB_STATUSES))
+        .values(status="cancelled", error="Cancelled by user")
+        .returning(ImportJob.id)
+    )
+    
+    if result.scalar_one_or_none() is None:
+        status = (await session.execute(
+            select(ImportJob.status).where(ImportJob.id == job_id)
+        )).scalar_one_or_none()
         
-        if not job:
+        if status is None:
             raise HTTPException(
                 status_code=404,
                 detail=f"Import job {job_id} not found"
             )
         
-        if job.status in ["completed", "failed", "cancelled"]:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Cannot cancel job with status: {job.status}"
-            )
-        
-        # Set cancellation flag in Redis
-        redis_client = await get_async_redis()
-        await redis_client.setex(f"cancel:{job_id}", 300, "1")  # Expire after 5 minutes
-        
-        # Update job status
-        from sqlalchemy import update
-        await session.execute(
-            update(ImportJob)
-            .where(ImportJob.id == job_id)
-            .values(status="cancelled", error="Cancelled by user")
+        raise HTTPException(
+            status_code=400,
+            detail=f"Cannot cancel job with status: {status}"
         )
-        await session.commit()
-        
-        print(f"[Cancel] Job {job_id} marked for cancellation")
-        
-        return {"message": f"Job {job_id} has been cancelled"}
+    
+    await session.commit()
+    
+    # Set cancellation flag in Redis (read by tasks that haven't started yet)
+    # and notify a running task over pub/sub
+    redis_client = await get_async_redis()
+    async with redis_client.pipeline(transaction=False) as pipe:
+        pipe.setex(f"cancel:{job_id}", 300, "1")  # Expire after 5 minutes
+        pipe.publish(f"cancel:{job_id}", "1")
+        await pipe.execute()
+    
+    print(f"[Cancel] Job {job_id} marked for cancellation")
+    
+    return {"message": f"Job {job_id} has been cancelled"}
 
 
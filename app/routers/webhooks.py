@@ -8,14 +8,19 @@
 # - POST /api/webhooks/{id}/test: Test webhook
 # - GET /api/webhooks/{id}/logs: Get webhook logs
 
-from typing import List
+import asyncio
+import os
+from typing import Any, Dict, List, Optional
 
-from fastapi import APIRouter, HTTPException, Query
-from sqlalchemy import select
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import TypeAdapter
+from sqlalchemy import delete, select, update
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db import AsyncSessionLocal
+from app.db import get_db
 from app.models import Webhook, WebhookEvent
+from app.responses import ORJSONResponse
 from app.schemas import (
     WebhookCreate,
     WebhookUpdate,
@@ -25,89 +30,159 @@ from app.schemas import (
     MessageResponse,
 )
 from app.tasks import send_webhook_task
+from app.utils import get_async_redis
 
 router = APIRouter()
 
+# Validators built once (schema resolved at import, not per row)
+WEBHOOK_ADAPTER = TypeAdapter(WebhookResponse)
+WEBHOOK_LIST_ADAPTER = TypeAdapter(List[WebhookResponse])
+WEBHOOK_EVENT_LIST_ADAPTER = TypeAdapter(List[WebhookEventResponse])
+
+
+def _serialize(adapter: TypeAdapter, data: Any) -> Any:
+    """
+    Validate ORM objects once and return plain Python data for orjson
+
+    Handlers return an ORJSONResponse built from this, so FastAPI skips its
+    own response_model pass (response_model stays declared for the docs).
+    """
+    return adapter.dump_python(adapter.validate_python(data, from_attributes=True))
+
+
+# Short-lived Redis cache of {url, enabled} per webhook for test_webhook;
+# update/delete invalidate it, the TTL bounds staleness from anything else
+WEBHOOK_CACHE_TTL = int(os.getenv("WEBHOOK_CACHE_TTL", "30"))
+
+
+def _webhook_cache_key(webhook_id: int) -> str:
+    return f"webhook:{webhook_id}"
+
+
+async def _get_cached_webhook(webhook_id: int) -> Optional[Dict[str, Any]]:
+    try:
+        redis_client = await get_async_redis()
+        cached = await redis_client.hgetall(_webhook_cache_key(webhook_id))
+    except Exception as e:
+        print(f"[Webhooks] Cache read failed for webhook {webhook_id}: {e}")
+        return None
+    if not cached:
+        return None
+    return {"url": cached["url"], "enabled": cached["enabled"] == "1"}
+
+
+async def _cache_webhook(webhook_id: int, webhook: Dict[str, Any]) -> None:
+    key = _webhook_cache_key(webhook_id)
+    try:
+        redis_client = await get_async_redis()
+        async with redis_client.pipeline(transaction=True) as pipe:
+            pipe.hset(key, mapping={"url": webhook["url"], "enabled": "1" if webhook["enabled"] else "0"})
+            pipe.expire(key, WEBHOOK_CACHE_TTL)
+            await pipe.execute()
+    except Exception as e:
+        print(f"[Webhooks] Cache write failed for webhook {webhook_id}: {e}")
+
+
+async def _invalidate_cached_webhook(webhook_id: int) -> None:
+    try:
+        redis_client = await get_async_redis()
+        await redis_client.delete(_webhook_cache_key(webhook_id))
+    except Exception as e:
+        print(f"[Webhooks] Cache invalidation failed for webhook {webhook_id}: {e}")
+
 
 @router.get("/webhooks", response_model=List[WebhookResponse])
-async def list_webhooks():
+async def list_webhooks(session: AsyncSession = Depends(get_db)):
     """
     List all webhooks
     """
-    async with AsyncSessionLocal() as session:
-        result = await session.execute(
-            select(Webhook).order_by(Webhook.created_at.desc())
-        )
-        webhooks = result.scalars().all()
-        
-        return [WebhookResponse.model_validate(w) for w in webhooks]
+    result = await session.execute(
+        select(Webhook).order_by(Webhook.created_at.desc())
+    )
+    webhooks = result.scalars().all()
+    
+    return ORJSONResponse(_serialize(WEBHOOK_LIST_ADAPTER, webhooks))
 
 
 @router.get("/webhooks/{webhook_id}", response_model=WebhookResponse)
-async def get_webhook(webhook_id: int):
+async def get_webhook(webhook_id: int, session: AsyncSession = Depends(get_db)):
     """
     Get single webhook by ID
     """
-    async with AsyncSessionLocal() as session:
-        result = await session.execute(
-            select(Webhook).where(Webhook.id == webhook_id)
+    result = await session.execute(
+        select(Webhook).where(Webhook.id == webhook_id)
+    )
+    webhook = result.scalar_one_or_none()
+    
+    if not webhook:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Webhook {webhook_id} not found"
         )
-        webhook = result.scalar_one_or_none()
-        
-        if not webhook:
-            raise HTTPException(
-                status_code=404,
-                detail=f"Webhook {webhook_id} not found"
-            )
-        
-        return WebhookResponse.model_validate(webhook)
+    
+    return ORJSONResponse(_serialize(WEBHOOK_ADAPTER, webhook))
 
 
 @router.post("/webhooks", response_model=WebhookResponse, status_code=201)
-async def create_webhook(webhook_data: WebhookCreate):
+async def create_webhook(webhook_data: WebhookCreate, session: AsyncSession = Depends(get_db)):
     """
     Create a new webhook
     
     - URL must be valid HTTP/HTTPS endpoint
     - Event type must be valid
     """
-    async with AsyncSessionLocal() as session:
-        try:
-            webhook = Webhook(
-                name=webhook_data.name,
-                url=webhook_data.url,
-                event=webhook_data.event,
-                enabled=webhook_data.enabled
-            )
-            
-            session.add(webhook)
-            await session.commit()
-            await session.refresh(webhook)
-            
-            print(f"[Webhooks] Created webhook: {webhook.id} ({webhook.name})")
-            
-            return WebhookResponse.model_validate(webhook)
-            
-        except IntegrityError as e:
-            await session.rollback()
-            raise HTTPException(
-                status_code=400,
-                detail=f"Database error: {str(e.orig)}"
-            )
+    try:
+        webhook = Webhook(
+            name=webhook_data.name,
+            url=str(webhook_data.url),
+            event=webhook_data.event,
+            enabled=webhook_data.enabled
+        )
+        
+        session.add(webhook)
+        await session.commit()
+        await session.refresh(webhook)
+        
+        print(f"[Webhooks] Created webhook: {webhook.id} ({webhook.name})")
+        
+        return ORJSONResponse(_serialize(WEBHOOK_ADAPTER, webhook), status_code=201)
+        
+    except IntegrityError as e:
+        await session.rollback()
+        raise HTTPException(
+            status_code=400,
+            detail=f"Database error: {str(e.orig)}"
+        )
 
 
 @router.put("/webhooks/{webhook_id}", response_model=WebhookResponse)
-async def update_webhook(webhook_id: int, webhook_data: WebhookUpdate):
+async def update_webhook(
+    webhook_id: int,
+    webhook_data: WebhookUpdate,
+    session: AsyncSession = Depends(get_db),
+):
     """
     Update existing webhook
     
     - All fields are optional
     """
-    async with AsyncSessionLocal() as session:
-        # Fetch webhook
-        result = await session.execute(
-            select(Webhook).where(Webhook.id == webhook_id)
-        )
+    # Only fields present in the request (and not null) are changed
+    # (mode="json" turns the validated URL back into a plain string)
+    patch = webhook_data.model_dump(mode="json", exclude_unset=True, exclude_none=True)
+    
+    try:
+        if patch:
+            # Single UPDATE ... RETURNING instead of SELECT + UPDATE + refresh
+            result = await session.execute(
+                update(Webhook)
+                .where(Webhook.id == webhook_id)
+                .values(**patch)
+                .returning(Webhook)
+            )
+        else:
+            result = await session.execute(
+                select(Webhook).where(Webhook.id == webhook_id)
+            )
         webhook = result.scalar_one_or_none()
         
         if not webhook:
@@ -116,67 +191,53 @@ async def update_webhook(webhook_id: int, webhook_data: WebhookUpdate):
                 detail=f"Webhook {webhook_id} not found"
             )
         
-        try:
-            # Update fields if provided
-            if webhook_data.name is not None:
-                webhook.name = webhook_data.name
-            
-            if webhook_data.url is not None:
-                webhook.url = webhook_data.url
-            
-            if webhook_data.event is not None:
-                webhook.event = webhook_data.event
-            
-            if webhook_data.enabled is not None:
-                webhook.enabled = webhook_data.enabled
-            
-            await session.commit()
-            await session.refresh(webhook)
-            
-            print(f"[Webhooks] Updated webhook: {webhook.id}")
-            
-            return WebhookResponse.model_validate(webhook)
-            
-        except IntegrityError as e:
-            await session.rollback()
-            raise HTTPException(
-                status_code=400,
-                detail=f"Database error: {str(e.orig)}"
-            )
+        await session.commit()
+        await _invalidate_cached_webhook(webhook_id)
+        
+        print(f"[Webhooks] Updated webhook: {webhook.id}")
+        
+        return ORJSONResponse(_serialize(WEBHOOK_ADAPTER, webhook))
+        
+    except IntegrityError as e:
+        await session.rollback()
+        raise HTTPException(
+            status_code=400,
+            detail=f"Database error: {str(e.orig)}"
+        )
 
 
 @router.delete("/webhooks/{webhook_id}", response_model=DeleteResponse)
-async def delete_webhook(webhook_id: int):
+async def delete_webhook(webhook_id: int, session: AsyncSession = Depends(get_db)):
     """
     Delete a webhook by ID
     
     - Also deletes all associated webhook events (cascade)
     """
-    async with AsyncSessionLocal() as session:
-        result = await session.execute(
-            select(Webhook).where(Webhook.id == webhook_id)
-        )
-        webhook = result.scalar_one_or_none()
-        
-        if not webhook:
-            raise HTTPException(
-                status_code=404,
-                detail=f"Webhook {webhook_id} not found"
-            )
-        
-        await session.delete(webhook)
-        await session.commit()
-        
-        print(f"[Webhooks] Deleted webhook: {webhook_id}")
-        
-        return DeleteResponse(
-            deleted=webhook_id,
-            message=f"Webhook {webhook_id} deleted successfully"
+    # Single DELETE ... RETURNING; webhook_events rows go with it through the
+    # ON DELETE CASCADE foreign key
+    result = await session.execute(
+        delete(Webhook).where(Webhook.id == webhook_id).returning(Webhook.id)
+    )
+    
+    if result.scalar_one_or_none() is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Webhook {webhook_id} not found"
         )
+    
+    await session.commit()
+    await _invalidate_cached_webhook(webhook_id)
+    
+    print(f"[Webhooks] Deleted webhook: {webhook_id}")
+    
+    return DeleteResponse(
+        deleted=webhook_id,
+        message=f"Webhook {webhook_id} deleted successfully"
+    )
 
 
 @router.post("/webhooks/{webhook_id}/test", response_model=MessageResponse)
-async def test_webhook(webhook_id: int):
+async def test_webhook(webhook_id: int, session: AsyncSession = Depends(get_db)):
     """
     Test webhook by sending a test event
     
@@ -184,24 +245,28 @@ async def test_webhook(webhook_id: int):
     - Creates webhook event log
     - Returns immediately (webhook sent in background)
     """
-    async with AsyncSessionLocal() as session:
-        # Fetch webhook
+    # Cached url/enabled, falling back to the database (only the columns needed here)
+    webhook = await _get_cached_webhook(webhook_id)
+    if webhook is None:
         result = await session.execute(
-            select(Webhook).where(Webhook.id == webhook_id)
+            select(Webhook.url, Webhook.enabled).where(Webhook.id == webhook_id)
         )
-        webhook = result.scalar_one_or_none()
+        row = result.one_or_none()
         
-        if not webhook:
+        if not row:
             raise HTTPException(
                 status_code=404,
                 detail=f"Webhook {webhook_id} not found"
             )
         
-        if not webhook.enabled:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Webhook {webhook_id} is disabled. Enable it first."
-            )
+        webhook = {"url": row.url, "enabled": row.enabled}
+        await _cache_webhook(webhook_id, webhook)
+    
+    if not webhook["enabled"]:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Webhook {webhook_id} is disabled. Enable it first."
+        )
     
     # Prepare test payload
     test_payload = {
@@ -213,7 +278,7 @@ async def test_webhook(webhook_id: int):
     
     # Trigger webhook task
     try:
-        send_webhook_task.delay(webhook_id, "test", test_payload)
+        await asyncio.to_thread(send_webhook_task.delay, webhook_id, "test", test_payload)
         print(f"[Webhooks] Test webhook dispatched for webhook {webhook_id}")
         
     except Exception as e:
@@ -223,14 +288,15 @@ async def test_webhook(webhook_id: int):
         )
     
     return MessageResponse(
-        message=f"Test webhook dispatched to {webhook.url}. Check logs for results."
+        message=f"Test webhook dispatched to {webhook['url']}. Check logs for results."
     )
 
 
 @router.get("/webhooks/{webhook_id}/logs", response_model=List[WebhookEventResponse])
 async def get_webhook_logs(
     webhook_id: int,
-    limit: int = Query(50, ge=1, le=500, description="Number of logs to return")
+    limit: int = Query(50, ge=1, le=500, description="Number of logs to return"),
+    session: AsyncSession = Depends(get_db),
 ):
     """
     Get webhook event logs
@@ -238,27 +304,26 @@ async def get_webhook_logs(
     - Returns recent delivery attempts
     - Ordered by most recent first
     """
-    async with AsyncSessionLocal() as session:
-        # Verify webhook exists
-        result = await session.execute(
-            select(Webhook).where(Webhook.id == webhook_id)
-        )
-        webhook = result.scalar_one_or_none()
-        
-        if not webhook:
-            raise HTTPException(
-                status_code=404,
-                detail=f"Webhook {webhook_id} not found"
-            )
-        
-        # Fetch logs
-        result = await session.execute(
-            select(WebhookEvent)
-            .where(WebhookEvent.webhook_id == webhook_id)
-            .order_by(WebhookEvent.created_at.desc())
-            .limit(limit)
+    # Verify webhook exists
+    result = await session.execute(
+        select(Webhook).where(Webhook.id == webhook_id)
+    )
+    webhook = result.scalar_one_or_none()
+    
+    if not webhook:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Webhook {webhook_id} not found"
         )
-        events = result.scalars().all()
-        
-        return [WebhookEventResponse.model_validate(e) for e in events]
+    
+    # Fetch logs
+    result = await session.execute(
+        select(WebhookEvent)
+        .where(WebhookEvent.webhook_id == webhook_id)
+        .order_by(WebhookEvent.created_at.desc())
+        .limit(limit)
+    )
+    events = result.scalars().all()
+    
+    return ORJSONResponse(_serialize(WEBHOOK_EVENT_LIST_ADAPTER, events))
 
@@ -7,10 +7,11 @@
 
 from datetime import datetime
 from decimal import Decimal
-from typing import Optional, List, Any
+from typing import Annotated, Optional, List, Any
 from uuid import UUID
 
-from pydantic import BaseModel, Field, HttpUrl, field_validator
+from pydantic import BaseModel, Field, HttpUrl, field_serializer, field_validator
+from pydantic.networks import UrlConstraints
 
 
 # ============================================================================
@@ -43,7 +44,6 @@ class ProductUpdate(BaseModel):
 class ProductResponse(ProductBase):
     """Schema for product response"""
     id: int
-    sku_ci: str
     created_at: datetime
     updated_at: datetime
 
@@ -64,34 +64,38 @@ class ProductListResponse(BaseModel):
 # Webhook Schemas
 # ============================================================================
 
+WEBHOOK_EVENTS = (
+    'product.created',
+    'product.updated',
+    'product.deleted',
+    'import.completed',
+    'test',
+)
+VALID_WEBHOOK_EVENTS = frozenset(WEBHOOK_EVENTS)
+INVALID_WEBHOOK_EVENT_MSG = f'Event must be one of: {", ".join(WEBHOOK_EVENTS)}'
+
+# http(s) URL validated by pydantic-core, capped at the webhooks.url column length
+WebhookUrl = Annotated[HttpUrl, UrlConstraints(max_length=2048)]
+
+
 class WebhookBase(BaseModel):
     """Base webhook schema"""
     name: str = Field(..., min_length=1, max_length=255, description="Webhook name")
-    url: str = Field(..., max_length=2048, description="Webhook URL")
+    url: WebhookUrl = Field(..., description="Webhook URL")
     event: str = Field(..., min_length=1, max_length=100, description="Event type")
     enabled: bool = Field(True, description="Webhook enabled status")
 
-    @field_validator('url')
-    @classmethod
-    def validate_url(cls, v: str) -> str:
-        """Validate URL format"""
-        if not v.startswith(('http://', 'https://')):
-            raise ValueError('URL must start with http:// or https://')
-        return v
+    @field_serializer('url')
+    def serialize_url(self, v: WebhookUrl) -> str:
+        """Webhook URLs are stored and returned as plain strings"""
+        return str(v)
 
     @field_validator('event')
     @classmethod
     def validate_event(cls, v: str) -> str:
         """Validate event type"""
-        valid_events = [
-            'product.created',
-            'product.updated',
-            'product.deleted',
-            'import.completed',
-            'test'
-        ]
-        if v not in valid_events:
-            raise ValueError(f'Event must be one of: {", ".join(valid_events)}')
+        if v not in VALID_WEBHOOK_EVENTS:
+            raise ValueError(INVALID_WEBHOOK_EVENT_MSG)
         return v
 
 
@@ -103,18 +107,10 @@ class WebhookCreate(WebhookBase):
 class WebhookUpdate(BaseModel):
     """Schema for updating a webhook (all fields optional)"""
     name: Optional[str] = Field(None, min_length=1, max_length=255)
-    url: Optional[str] = Field(None, max_length=2048)
+    url: Optional[WebhookUrl] = None
     event: Optional[str] = Field(None, min_length=1, max_length=100)
     enabled: Optional[bool] = None
 
-    @field_validator('url')
-    @classmethod
-    def validate_url(cls, v: Optional[str]) -> Optional[str]:
-        """Validate URL format"""
-        if v and not v.startswith(('http://', 'https://')):
-            raise ValueError('URL must start with http:// or https://')
-        return v
-
 
 class WebhookResponse(WebhookBase):
     """Schema for webhook response"""
@@ -155,6 +151,7 @@ class ImportJobResponse(BaseModel):
     status: str
     total_rows: Optional[int] = None
     processed_rows: Optional[int] = None
+    skipped_rows: Optional[int] = None
     error: Optional[str] = None
     created_at: datetime
 
@@ -173,6 +170,7 @@ class ProgressMessage(BaseModel):
     total: Optional[int] = None
     inserted: Optional[int] = None
     updated: Optional[int] = None
+    skipped: Optional[int] = None
     message: Optional[str] = None
     error: Optional[str] = None
 
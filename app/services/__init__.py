@@ -0,0 +1,2 @@
+# app/services/__init__.py
+# Shared in-process services
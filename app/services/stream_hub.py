@@ -0,0 +1,105 @@
+# app/services/stream_hub.py
+# Fan-out of Redis pub/sub channels to SSE clients
+# - StreamHub: one pubsub subscription per channel, shared by every client
+#   watching it, instead of one Redis connection per SSE stream
+
+import asyncio
+from typing import Awaitable, Callable, Dict, Set, Tuple
+
+import redis.asyncio as aioredis
+from redis.asyncio.client import PubSub
+
+from app.utils import get_blocking_redis
+
+
+class StreamHub:
+    """
+    Share pub/sub subscriptions between SSE clients
+
+    The first subscriber to a channel opens the pubsub and starts a reader
+    task; every message is copied to each subscriber's bounded queue. The
+    pubsub is torn down when the last subscriber leaves. A subscriber's queue
+    receives None when the channel's reader stops unexpectedly.
+    """
+
+    def __init__(
+        self,
+        get_client: Callable[[], Awaitable[aioredis.Redis]],
+        queue_size: int = 256,
+    ):
+        self._get_client = get_client
+        self._queue_size = queue_size
+        self._channels: Dict[str, Tuple[PubSub, Set[asyncio.Queue], asyncio.Task]] = {}
+        self._lock = asyncio.Lock()
+
+    async def subscribe(self, channel: str) -> asyncio.Queue:
+        """Register a subscriber and return the queue its messages arrive on"""
+        async with self._lock:
+            entry = self._channels.get(channel)
+            if entry is None:
+                redis_client = await self._get_client()
+                pubsub = redis_client.pubsub()
+                await pubsub.subscribe(channel)
+                subscribers: Set[asyncio.Queue] = set()
+                task = asyncio.create_task(self._read(channel, pubsub, subscribers))
+                entry = (pubsub, subscribers, task)
+                self._channels[channel] = entry
+                print(f"[StreamHub] Subscribed to Redis channel: {channel}")
+
+            queue: asyncio.Queue = asyncio.Queue(maxsize=self._queue_size)
+            entry[1].add(queue)
+            return queue
+
+    async def unsubscribe(self, channel: str, queue: asyncio.Queue) -> None:
+        """Remove a subscriber, closing the channel's pubsub if it was the last"""
+        async with self._lock:
+            entry = self._channels.get(channel)
+            if entry is None:
+                return
+            pubsub, subscribers, task = entry
+            subscribers.discard(queue)
+            if subscribers:
+                return
+            del self._channels[channel]
+
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        await pubsub.aclose()
+        print(f"[StreamHub] Unsubscribed from Redis channel: {channel}")
+
+    async def _read(self, channel: str, pubsub: PubSub, subscribers: Set[asyncio.Queue]) -> None:
+        try:
+            async for message in pubsub.listen():
+                if message["type"] != "message":
+                    continue
+                for queue in subscribers:
+                    try:
+                        queue.put_nowait(message["data"])
+                    except asyncio.QueueFull:
+                        print(f"[StreamHub] Subscriber queue full on {channel}, dropping message")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"[StreamHub] Error reading {channel}: {e}")
+            # Forget the broken subscription (the next subscriber opens a fresh
+            # one) and wake current subscribers so their streams can end
+            entry = self._channels.get(channel)
+            if entry is not None and entry[0] is pubsub:
+                del self._channels[channel]
+            for queue in subscribers:
+                _put_end(queue)
+            await pubsub.aclose()
+
+
+def _put_end(queue: asyncio.Queue) -> None:
+    """Deliver the end-of-stream marker, making room for it if the queue is full"""
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(None)
+
+
+# Shared by all SSE streams in this process
+stream_hub = StreamHub(get_blocking_redis)
@@ -0,0 +1,278 @@
+# app/storage.py
+# CSV upload staging
+# - Web process stages the uploaded CSV, worker reads it back by storage key
+# - "redis" backend (default): works when web and worker run in separate
+#   containers without a shared file system (Railway)
+# - "local" backend: UPLOAD_DIR on a volume mounted by both services
+# - "s3" backend: S3-compatible object storage (AWS, MinIO, R2); needs boto3,
+#   which is only imported when an s3 key is actually used
+#
+# Storage keys carry their backend as a prefix ("redis:<key>", "file:<path>", "s3:<key>")
+# so a worker can always read a job staged by a differently-configured web process.
+
+import asyncio
+import os
+from typing import AsyncIterable, Iterator, Optional
+
+import aiofiles
+import redis
+import redis.asyncio as aioredis
+
+CSV_STORAGE = os.getenv("CSV_STORAGE", "redis")
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", "uploads")
+CSV_STORAGE_TTL = int(os.getenv("CSV_STORAGE_TTL", "86400"))  # Staged CSVs expire after 24h
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+S3_BUCKET = os.getenv("S3_BUCKET")
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL")  # Set for MinIO / R2, unset for AWS
+S3_PART_SIZE = 8 * 1024 * 1024  # Multipart upload part size (S3 minimum is 5 MiB)
+CSV_READ_CHUNK_SIZE = 4 * 1024 * 1024  # Worker reads staged CSVs this much at a time
+
+REDIS_PREFIX = "redis:"
+FILE_PREFIX = "file:"
+S3_PREFIX = "s3:"
+
+# Binary-safe clients (the shared clients in app.utils decode responses to str)
+_async_redis: Optional[aioredis.Redis] = None
+_sync_redis: Optional[redis.Redis] = None
+_s3_client = None
+
+
+def _get_async_redis() -> aioredis.Redis:
+    global _async_redis
+    if _async_redis is None:
+        _async_redis = aioredis.from_url(REDIS_URL)
+    return _async_redis
+
+
+def _get_sync_redis() -> redis.Redis:
+    global _sync_redis
+    if _sync_redis is None:
+        _sync_redis = redis.from_url(REDIS_URL)
+    return _sync_redis
+
+
+def _get_s3():
+    global _s3_client
+    if _s3_client is None:
+        import boto3  # Optional dependency, only needed for CSV_STORAGE=s3
+
+        _s3_client = boto3.client("s3", endpoint_url=S3_ENDPOINT_URL or None)
+    return _s3_client
+
+
+async def save_csv_stream(job_id: str, chunks: AsyncIterable[bytes]) -> str:
+    """
+    Stage an uploaded CSV for the import worker, chunk by chunk
+
+    The upload is never held in memory as a whole: chunks go straight to the
+    file (local) or are APPENDed to the Redis key. A partially written upload
+    is removed if the chunk source raises (e.g. the size limit is exceeded).
+
+    Args:
+        job_id: Import job UUID
+        chunks: Raw CSV bytes, in order
+
+    Returns:
+        Storage key to pass to the worker
+    """
+    if CSV_STORAGE == "s3":
+        return await _save_s3_stream(job_id, chunks)
+
+    if CSV_STORAGE == "local":
+        path = os.path.join(UPLOAD_DIR, f"{job_id}.csv")
+        try:
+            async with aiofiles.open(path, "wb") as f:
+                async for chunk in chunks:
+                    await f.write(chunk)
+        except BaseException:
+            await asyncio.to_thread(_remove_file, path)
+            raise
+        return f"{FILE_PREFIX}{path}"
+
+    key = f"importer:csv:{job_id}"
+    client = _get_async_redis()
+    try:
+        # Empty uploads still need a key, or the worker would treat them as expired
+        await client.set(key, b"", ex=CSV_STORAGE_TTL)
+        async for chunk in chunks:
+            async with client.pipeline(transaction=False) as pipe:
+                pipe.append(key, chunk)
+                pipe.expire(key, CSV_STORAGE_TTL)
+                await pipe.execute()
+    except BaseException:
+        await client.delete(key)
+        raise
+    return f"{REDIS_PREFIX}{key}"
+
+
+async def _save_s3_stream(job_id: str, chunks: AsyncIterable[bytes]) -> str:
+    """Multipart-upload the chunks to S3 (boto3 calls run in a thread)"""
+    key = f"importer/csv/{job_id}.csv"
+    s3 = _get_s3()
+    upload = await asyncio.to_thread(
+        s3.create_multipart_upload, Bucket=S3_BUCKET, Key=key, ContentType="text/csv"
+    )
+    upload_id = upload["UploadId"]
+    parts = []
+    buffer = bytearray()
+
+    async def upload_part() -> None:
+        part_number = len(parts) + 1
+        response = await asyncio.to_thread(
+            s3.upload_part,
+            Bucket=S3_BUCKET,
+            Key=key,
+            UploadId=upload_id,
+            PartNumber=part_number,
+            Body=bytes(buffer),
+        )
+        parts.append({"ETag": response["ETag"], "PartNumber": part_number})
+        buffer.clear()
+
+    try:
+        async for chunk in chunks:
+            buffer.extend(chunk)
+            if len(buffer) >= S3_PART_SIZE:
+                await upload_part()
+        # The last part may be smaller than the minimum; an empty upload still needs one part
+        if buffer or not parts:
+            await upload_part()
+        await asyncio.to_thread(
+            s3.complete_multipart_upload,
+            Bucket=S3_BUCKET,
+            Key=key,
+            UploadId=upload_id,
+            MultipartUpload={"Parts": parts},
+        )
+    except BaseException:
+        await asyncio.to_thread(
+            s3.abort_multipart_upload, Bucket=S3_BUCKET, Key=key, UploadId=upload_id
+        )
+        raise
+    return f"{S3_PREFIX}{key}"
+
+
+def _remove_file(path: str) -> None:
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def csv_size(storage_key: str) -> Optional[int]:
+    """
+    Size of staged CSV content in bytes
+
+    Args:
+        storage_key: Key returned by save_csv_stream
+
+    Returns:
+        Size in bytes, or None if the upload expired or was already removed
+    """
+    if storage_key.startswith(FILE_PREFIX):
+        path = storage_key[len(FILE_PREFIX):]
+        return os.path.getsize(path) if os.path.exists(path) else None
+
+    if storage_key.startswith(REDIS_PREFIX):
+        key = storage_key[len(REDIS_PREFIX):]
+        client = _get_sync_redis()
+        with client.pipeline(transaction=False) as pipe:
+            pipe.exists(key)
+            pipe.strlen(key)
+            exists, size = pipe.execute()
+        return size if exists else None
+
+    if storage_key.startswith(S3_PREFIX):
+        s3 = _get_s3()
+        try:
+            response = s3.head_object(Bucket=S3_BUCKET, Key=storage_key[len(S3_PREFIX):])
+        except s3.exceptions.ClientError as e:
+            if e.response["Error"]["Code"] in ("404", "NoSuchKey"):
+                return None
+            raise
+        return response["ContentLength"]
+
+    raise ValueError(f"Unknown CSV storage key: {storage_key}")
+
+
+def iter_csv(storage_key: str, start: int = 0, end: Optional[int] = None) -> Optional[Iterator[bytes]]:
+    """
+    Stream staged CSV content (sync, for Celery tasks)
+
+    Only one CSV_READ_CHUNK_SIZE chunk is held at a time: GETRANGE slices for
+    Redis, the open file for local, the response body for S3.
+
+    Args:
+        storage_key: Key returned by save_csv_stream
+        start: First byte to read
+        end: Stop before this byte (default: end of the file)
+
+    Returns:
+        Iterator over CSV bytes, or None if the upload expired or was already removed
+    """
+    if storage_key.startswith(FILE_PREFIX):
+        path = storage_key[len(FILE_PREFIX):]
+        if not os.path.exists(path):
+            return None
+        return _iter_file(path, start, end)
+
+    if storage_key.startswith(REDIS_PREFIX):
+        key = storage_key[len(REDIS_PREFIX):]
+        client = _get_sync_redis()
+        if not client.exists(key):
+            return None
+        return _iter_redis(client, key, start, end)
+
+    if storage_key.startswith(S3_PREFIX):
+        s3 = _get_s3()
+        byte_range = f"bytes={start}-{'' if end is None else end - 1}"
+        try:
+            response = s3.get_object(
+                Bucket=S3_BUCKET, Key=storage_key[len(S3_PREFIX):], Range=byte_range
+            )
+        except s3.exceptions.NoSuchKey:
+            return None
+        return response["Body"].iter_chunks(CSV_READ_CHUNK_SIZE)
+
+    raise ValueError(f"Unknown CSV storage key: {storage_key}")
+
+
+def _iter_file(path: str, start: int, end: Optional[int]) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = float("inf") if end is None else end - start
+        while remaining > 0:
+            chunk = f.read(int(min(CSV_READ_CHUNK_SIZE, remaining)))
+            if not chunk:
+                return
+            remaining -= len(chunk)
+            yield chunk
+
+
+def _iter_redis(client: redis.Redis, key: str, start: int, end: Optional[int]) -> Iterator[bytes]:
+    while end is None or start < end:
+        stop = start + CSV_READ_CHUNK_SIZE
+        if end is not None:
+            stop = min(stop, end)
+        chunk = client.getrange(key, start, stop - 1)
+        if chunk:
+            yield chunk
+        if len(chunk) < stop - start:
+            return
+        start = stop
+
+
+def delete_csv(storage_key: str) -> None:
+    """
+    Remove staged CSV content once it has been imported
+
+    Args:
+        storage_key: Key returned by save_csv_stream
+    """
+    try:
+        if storage_key.startswith(FILE_PREFIX):
+            os.remove(storage_key[len(FILE_PREFIX):])
+        elif storage_key.startswith(REDIS_PREFIX):
+            _get_sync_redis().delete(storage_key[len(REDIS_PREFIX):])
+        elif storage_key.startswith(S3_PREFIX):
+            _get_s3().delete_object(Bucket=S3_BUCKET, Key=storage_key[len(S3_PREFIX):])
+    except Exception as e:
+        print(f"[Storage] Failed to remove staged CSV {storage_key}: {e}")
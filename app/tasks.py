@@ -1,70 +1,570 @@
 # app/tasks.py
 # Celery background tasks
 # - import_csv_task: CSV import with batch processing
+# - import_csv_chunk_task: Import one byte range of a CSV split across workers
 # - bulk_delete_task: Delete all products
 # - send_webhook_task: Send webhook notifications
+# - send_webhooks_batch_task: Fan one event out to many webhooks concurrently
 
+import asyncio
+import codecs
+import functools
+import io
+import itertools
 import os
+import threading
 import time
 import traceback
 from datetime import datetime
-from decimal import Decimal
-from typing import Dict, List, Any
+from typing import TYPE_CHECKING, Dict, Iterator, List, Any, Optional, Sequence, Tuple
 
-import httpx
+import psycopg2.errors
 import redis
-from sqlalchemy import text, select, update
-from sqlalchemy.dialects.postgresql import insert
+from celery import group
+from celery.signals import worker_process_shutdown
+from sqlalchemy import bindparam, func, text, select, update, insert
 
 from app.celery_app import celery_app
 from app.db import SyncSessionLocal
-from app.models import Product, ImportJob, Webhook, WebhookEvent
-from app.utils import publish_progress, stream_csv_file, safe_float, clean_string
+from app.models import ImportJob, Webhook, WebhookEvent
+from app.storage import csv_size, iter_csv, delete_csv
+from app.utils import publish_progress, stream_csv_file, sync_redis_pool
+
+if TYPE_CHECKING:
+    import httpx
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
 
 
 # Configuration
 IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "10000"))  # Optimized batch size for maximum performance
+CSV_BLOCK_SIZE = 4 << 20  # Bytes pyarrow parses per RecordBatch
+IMPORT_WORK_MEM = os.getenv("IMPORT_WORK_MEM", "256MB")  # work_mem for the import transaction
+# Files of at least IMPORT_PARALLEL_MIN_MB are split into this many chunk tasks
+# (1 disables splitting: the import then runs as a single transaction)
+IMPORT_PARALLEL_CHUNKS = int(os.getenv("IMPORT_PARALLEL_CHUNKS", "1"))
+IMPORT_PARALLEL_MIN_BYTES = int(os.getenv("IMPORT_PARALLEL_MIN_MB", "64")) * 1024 * 1024
+CHUNK_STATE_TTL = 86400  # Seconds a split import's Redis bookkeeping is kept
+
+# CSV columns read by the importer (missing ones come back as nulls)
+CSV_COLUMNS = ("sku", "name", "description", "price")
 
 # Redis client for checking cancellation
 def get_sync_redis():
-    """Get synchronous Redis client"""
-    redis_url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
-    return redis.from_url(redis_url, decode_responses=True)
+    """Get synchronous Redis client backed by the shared connection pool"""
+    return redis.Redis(connection_pool=sync_redis_pool)
+
+
+# pyarrow and httpx are imported on first use, so processes that never run an
+# import or send a webhook (the web app, which only enqueues these tasks, and
+# single-purpose workers) don't pay for loading them
+@functools.lru_cache(maxsize=1)
+def _arrow():
+    """pyarrow, pyarrow.compute and pyarrow.csv"""
+    import pyarrow
+    import pyarrow.compute
+    import pyarrow.csv
+    return pyarrow, pyarrow.compute, pyarrow.csv
+
+
+@functools.lru_cache(maxsize=1)
+def _httpx():
+    import httpx
+    return httpx
+
+
+class CancelWatcher:
+    """
+    Watch a job's cancel:{job_id} pub/sub channel from a background thread
+    
+    The import loop checks `cancelled` (a threading.Event, no Redis round
+    trip) instead of polling the cancel:{job_id} key. The key is still read
+    once after subscribing, to catch cancellations that happened before the
+    task started.
+    """
+    
+    def __init__(self, redis_client: redis.Redis, job_id: str):
+        self._redis = redis_client
+        self._key = f"cancel:{job_id}"
+        self._event = threading.Event()
+        self._stopped = threading.Event()
+        
+        self._pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+        self._pubsub.subscribe(self._key)
+        if redis_client.get(self._key):
+            self._event.set()
+        
+        self._thread = threading.Thread(target=self._listen, name="cancel-watcher", daemon=True)
+        self._thread.start()
+    
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+    
+    def close(self) -> None:
+        """Stop listening and release the pub/sub connection"""
+        self._stopped.set()
+        self._thread.join(timeout=2)
+        self._pubsub.close()
+    
+    def _listen(self) -> None:
+        while not self._stopped.is_set() and not self._event.is_set():
+            try:
+                if self._pubsub.get_message(timeout=1.0):
+                    self._event.set()
+            except redis.RedisError as e:
+                # Subscription dropped: poll the flag until it reconnects
+                print(f"[Import] Cancel subscription error for {self._key}: {e}")
+                time.sleep(1)
+                try:
+                    if self._redis.get(self._key):
+                        self._event.set()
+                except redis.RedisError:
+                    pass
+
+
+class _SkippedRowCounter:
+    """
+    pyarrow invalid_row_handler that skips rows whose field count doesn't
+    match the header, counting them so the job can report the loss
+    
+    Called from pyarrow's parser threads, hence the lock.
+    """
+    
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+    
+    def __call__(self, row) -> str:
+        with self._lock:
+            self.count += 1
+        return 'skip'
+
+
+class _ChunkReader(io.RawIOBase):
+    """Read-only file object over an iterator of byte chunks"""
+    
+    def __init__(self, chunks: Iterator[bytes]):
+        self._chunks = chunks
+        self._pending = b""
+    
+    def readable(self) -> bool:
+        return True
+    
+    def readinto(self, buffer) -> int:
+        while not self._pending:
+            self._pending = next(self._chunks, b"")
+            if not self._pending:
+                return 0
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+
+def _replace_invalid_utf8(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    """
+    Replace invalid UTF-8 (pyarrow rejects it outright), chunk by chunk
+    
+    ASCII chunks are passed through untouched; everything else goes through
+    an incremental decoder so characters split across chunks survive.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    for chunk in chunks:
+        if chunk.isascii() and not decoder.getstate()[0]:
+            yield chunk
+        else:
+            yield decoder.decode(chunk).encode("utf-8")
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail.encode("utf-8")
+
+
+def _open_csv_reader(chunks: Iterator[bytes], skipped_rows: _SkippedRowCounter) -> "pa_csv.CSVStreamingReader":
+    """
+    Open a streaming pyarrow CSV reader over the staged upload
+    
+    All columns are read as strings so a malformed price can't fail the whole
+    read; short/long rows are skipped (and counted) instead of aborting the import.
+    
+    Args:
+        chunks: Raw CSV content, as streamed from storage
+        skipped_rows: Counts rows dropped for having the wrong number of fields
+        
+    Returns:
+        Reader yielding one RecordBatch per CSV_BLOCK_SIZE block
+    """
+    pa, pc, pa_csv = _arrow()
+    
+    return pa_csv.open_csv(
+        io.BufferedReader(_ChunkReader(_replace_invalid_utf8(chunks)), CSV_BLOCK_SIZE),
+        read_options=pa_csv.ReadOptions(block_size=CSV_BLOCK_SIZE),
+        parse_options=pa_csv.ParseOptions(
+            newlines_in_values=True,
+            invalid_row_handler=skipped_rows,
+        ),
+        convert_options=pa_csv.ConvertOptions(
+            column_types={column: pa.string() for column in CSV_COLUMNS},
+            include_columns=list(CSV_COLUMNS),
+            include_missing_columns=True,
+        ),
+    )
+
+
+# Prices float() would accept (minus nan/inf, which don't fit numeric anyway)
+_PRICE_PATTERN = r"^[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?$"
+
+
+def _trimmed(column: "pa.Array", max_length: Optional[int] = None) -> "pa.Array":
+    """Strip whitespace (nulls become empty strings) and optionally truncate"""
+    _, pc, _ = _arrow()
+    column = pc.utf8_trim_whitespace(column.fill_null(""))
+    if max_length:
+        column = pc.utf8_slice_codeunits(column, 0, max_length)
+    return column
+
+
+def _clean_batch(record_batch: "pa.RecordBatch") -> "pa.Table":
+    """
+    Clean a parsed CSV block with pyarrow compute kernels (whole columns at a
+    time, no per-row Python)
+    
+    Args:
+        record_batch: Raw string columns from the CSV reader
+        
+    Returns:
+        Table with STAGING_COLUMNS, rows without a SKU dropped
+    """
+    pa, pc, pa_csv = _arrow()
+    
+    sku = _trimmed(record_batch.column('sku'), 255)
+    keep = pc.greater(pc.utf8_length(sku), 0)  # Skip rows without SKU
+    
+    sku = sku.filter(keep)
+    name = _trimmed(record_batch.column('name').filter(keep), 1024)
+    description = _trimmed(record_batch.column('description').filter(keep))
+    
+    # Price is optional; unparseable values become 0 as before
+    price = _trimmed(record_batch.column('price').filter(keep))
+    has_price = pc.greater(pc.utf8_length(price), 0)
+    price = pc.if_else(pc.match_substring_regex(price, _PRICE_PATTERN), price, "0")
+    price = pc.if_else(has_price, price, pa.scalar(None, pa.string())).cast(pa.float64())
+    
+    return pa.table({
+        'sku': sku,
+        'name': pc.if_else(pc.greater(pc.utf8_length(name), 0), name, sku),  # Default name to SKU if empty
+        'description': description,
+        'price': price,
+        'active': pa.repeat(True, len(sku)),
+    })
+
+
+def _iter_import_batches(csv_reader: "pa_csv.CSVStreamingReader") -> Iterator["pa.Table"]:
+    """
+    Clean parsed CSV blocks and regroup them into IMPORT_BATCH_SIZE batches
+    
+    Batches stay Arrow tables all the way into the COPY buffer, so no
+    per-row Python objects are ever built.
+    
+    Args:
+        csv_reader: Reader from _open_csv_reader
+        
+    Yields:
+        Tables with STAGING_COLUMNS for _upsert_batch
+    """
+    pa, pc, pa_csv = _arrow()
+    
+    pending = []  # Cleaned tables not yet yielded
+    pending_rows = 0
+    
+    for record_batch in csv_reader:
+        cleaned = _clean_batch(record_batch)
+        pending.append(cleaned)
+        pending_rows += cleaned.num_rows
+        if pending_rows < IMPORT_BATCH_SIZE:
+            continue
+        
+        table = pa.concat_tables(pending)
+        offset = 0
+        while table.num_rows - offset >= IMPORT_BATCH_SIZE:
+            yield table.slice(offset, IMPORT_BATCH_SIZE)
+            offset += IMPORT_BATCH_SIZE
+        
+        pending = [table.slice(offset)]
+        pending_rows = table.num_rows - offset
+    
+    if pending_rows:
+        yield pa.concat_tables(pending)
+
+
+def _split_csv(chunks: Iterator[bytes], size: int, parts: int) -> Tuple[int, List[Tuple[int, int]]]:
+    """
+    Find byte offsets that split a CSV into roughly equal runs of whole records
+    
+    A newline only ends a record when an even number of quote characters
+    precede it (escaped "" quotes keep the parity), so quoted values with
+    embedded newlines are never cut. Stops reading once every split is found.
+    
+    Args:
+        chunks: CSV content, from the start
+        size: Total size in bytes
+        parts: Desired number of ranges
+        
+    Returns:
+        Tuple of (end of the header line, [(start, end), ...] record ranges)
+    """
+    targets = [size * i // parts for i in range(1, parts)]
+    header_end = None
+    boundaries = []
+    offset = 0
+    quotes = 0
+    
+    for chunk in chunks:
+        position = 0
+        while header_end is None or targets:
+            search_from = position if header_end is None else max(position, targets[0] - offset)
+            newline = chunk.find(b"\n", search_from)
+            if newline < 0:
+                break
+            position = newline + 1
+            if (quotes + chunk.count(b'"', 0, newline)) % 2:
+                continue  # Inside a quoted value
+            
+            boundary = offset + position
+            if header_end is None:
+                header_end = boundary
+            else:
+                boundaries.append(boundary)
+            targets = [target for target in targets if target >= boundary]
+        
+        if header_end is not None and not targets:
+            break
+        quotes += chunk.count(b'"')
+        offset += len(chunk)
+    
+    if header_end is None:
+        return size, []
+    
+    starts = [header_end] + boundaries
+    ends = boundaries + [size]
+    return header_end, [(start, end) for start, end in zip(starts, ends) if start < end]
+
+
+# Per-chunk counters in the chunk state hash, stored as "<counter>:<start>"
+CHUNK_COUNTERS = ("processed", "inserted", "updated", "skipped")
+
+
+def _chunk_state_key(job_id: str) -> str:
+    """
+    Redis hash tracking a split import
+    
+    Holds the chunk count, each chunk's counters ("processed:<start>", ...)
+    and exit marker ("exited:<start>"), plus "stopped" once any chunk failed
+    or was cancelled and "finished" once the job was completed or cleaned up.
+    Everything is keyed by chunk, so a redelivered chunk task (acks_late)
+    overwrites its own counters instead of adding to the job's totals twice.
+    """
+    return f"import:{job_id}:chunks"
+
+
+def _chunk_totals(state: Dict[str, str]) -> Dict[str, int]:
+    """Sum every chunk's counters in a chunk state hash"""
+    totals = dict.fromkeys(CHUNK_COUNTERS, 0)
+    for field, value in state.items():
+        counter, _, _ = field.partition(":")
+        if counter in totals:
+            totals[counter] += int(value)
+    return totals
+
+
+def _dispatch_import_chunks(job_id: str, storage_key: str, size: int) -> bool:
+    """
+    Split a staged CSV into IMPORT_PARALLEL_CHUNKS ranges and queue one
+    import_csv_chunk_task per range
+    
+    Args:
+        job_id: UUID of the ImportJob record
+        storage_key: Location of the staged CSV
+        size: Staged CSV size in bytes
+        
+    Returns:
+        True if chunk tasks were queued, False if the file didn't split
+    """
+    header_end, ranges = _split_csv(iter_csv(storage_key) or iter(()), size, IMPORT_PARALLEL_CHUNKS)
+    if len(ranges) < 2:
+        return False
+    
+    # Not reset: a redelivered import_csv_task splits the file the same way,
+    # and its chunk tasks then find their own earlier counters and exit markers
+    state_key = _chunk_state_key(job_id)
+    with get_sync_redis().pipeline() as pipe:
+        pipe.hset(state_key, "chunks", len(ranges))
+        pipe.expire(state_key, CHUNK_STATE_TTL)
+        pipe.execute()
+    
+    group(
+        import_csv_chunk_task.s(job_id, storage_key, header_end, start, end)
+        for start, end in ranges
+    ).apply_async()
+    
+    print(f"[Import] Split job {job_id} into {len(ranges)} chunks")
+    return True
+
+
+def _chunk_exited(
+    redis_client: redis.Redis,
+    state_key: str,
+    start: int,
+    counts: Optional[Dict[str, int]] = None,
+    stopped: bool = False,
+) -> Optional[Dict[str, str]]:
+    """
+    Record that a chunk task has exited
+    
+    Exit markers are per chunk, so a redelivered chunk can't count as a second
+    exit, and only one caller ever gets the final state back.
+    
+    Args:
+        redis_client: Sync Redis client
+        state_key: The job's chunk state hash
+        start: The chunk's first byte (identifies it in the hash)
+        counts: The chunk's final counters
+        stopped: The chunk failed or was cancelled (the job must not complete)
+        
+    Returns:
+        The job's final chunk state if this was the last chunk to exit, else None
+    """
+    mapping = {f"exited:{start}": 1}
+    if counts:
+        mapping.update({f"{counter}:{start}": value for counter, value in counts.items()})
+    if stopped:
+        mapping["stopped"] = 1
+    
+    with redis_client.pipeline() as pipe:
+        pipe.hset(state_key, mapping=mapping)
+        pipe.hgetall(state_key)
+        _, state = pipe.execute()
+    
+    exited = sum(1 for field in state if field.startswith("exited:"))
+    if exited < int(state.get("chunks") or 0):
+        return None
+    # Two deliveries of the last chunk can both get here; only one finishes the job
+    if not redis_client.hsetnx(state_key, "finished", 1):
+        return None
+    return state
+
+
+def _finish_import(
+    session, job_id: str, storage_key: str, processed: int, inserted: int, updated: int, skipped: int
+) -> None:
+    """Mark the job completed, publish completion and drop the staged CSV"""
+    session.execute(
+        update(ImportJob)
+        .where(ImportJob.id == job_id)
+        .values(
+            status="completed",
+            total_rows=processed,
+            processed_rows=processed,
+            skipped_rows=skipped
+        )
+    )
+    session.commit()
+    
+    # Publish completion
+    message = f"Import complete! Processed {processed:,} products ({inserted:,} new, {updated:,} updated)"
+    if skipped:
+        message += f"; skipped {skipped:,} malformed rows"
+    publish_progress(job_id, {
+        "status": "complete",
+        "processed": processed,
+        "inserted": inserted,
+        "updated": updated,
+        "skipped": skipped,
+        "percent": 100,
+        "message": message
+    })
+    
+    print(f"[Import] Completed successfully: {processed} rows processed, {skipped} malformed rows skipped")
+    
+    # Staged upload is no longer needed
+    delete_csv(storage_key)
 
 
-@celery_app.task(bind=True, name="app.tasks.import_csv_task")
-def import_csv_task(self, job_id: str):
+def _fail_import(session, job_id: str, error: Exception) -> None:
+    """Mark the job failed and publish the error (call from an except block)"""
+    error_msg = str(error)
+    error_trace = traceback.format_exc()
+    
+    print(f"[Import] ERROR: {error_msg}")
+    print(error_trace)
+    
+    # Mark job as failed
+    try:
+        session.rollback()
+        session.execute(
+            update(ImportJob)
+            .where(ImportJob.id == job_id)
+            .values(
+                status="failed",
+                error=error_trace
+            )
+        )
+        session.commit()
+    except Exception as db_err:
+        print(f"[Import] Failed to update job status: {db_err}")
+    
+    # Publish error
+    publish_progress(job_id, {
+        "status": "error",
+        "error": error_msg,
+        "message": f"Import failed: {error_msg}"
+    })
+
+
+@celery_app.task(bind=True, name="app.tasks.import_csv_task", ignore_result=True, acks_late=True)
+def import_csv_task(self, job_id: str, storage_key: str = None):
     """
     Import CSV file in background with batch processing and progress updates
     
+    Large files are split across import_csv_chunk_task workers when
+    IMPORT_PARALLEL_CHUNKS > 1; otherwise the whole import runs here, in a
+    single transaction.
+    
     Args:
         job_id: UUID of the ImportJob record
+        storage_key: Location of the staged CSV (defaults to the job's storage_key)
     """
     print(f"[Task] Starting CSV import for job {job_id}")
     
     session = SyncSessionLocal()
-    redis_client = get_sync_redis()
+    cancel_watcher = None
     
     try:
-        # Check if job is already cancelled
-        if redis_client.get(f"cancel:{job_id}"):
+        # Check if job is already cancelled, then listen for cancellation
+        cancel_watcher = CancelWatcher(get_sync_redis(), job_id)
+        if cancel_watcher.cancelled:
             print(f"[Import] Job {job_id} was cancelled before starting")
+            if storage_key:
+                delete_csv(storage_key)
             session.close()
             return
         
-        # Fetch ImportJob and CSV data from database
+        # Fetch ImportJob from database
         import_job = session.query(ImportJob).filter(ImportJob.id == job_id).first()
         if not import_job:
             print(f"[Import] ERROR: Job {job_id} not found in database")
             session.close()
             return
         
-        if not import_job.csv_data:
+        # Check the staged CSV is still there
+        storage_key = storage_key or import_job.storage_key
+        size = csv_size(storage_key) if storage_key else None
+        if not size:
             print(f"[Import] ERROR: No CSV data found for job {job_id}")
             session.execute(
                 update(ImportJob)
                 .where(ImportJob.id == job_id)
-                .values(status="failed", error="No CSV data found")
+                .values(status="failed", error="No CSV data found (upload expired or missing)")
             )
             session.commit()
             session.close()
@@ -86,217 +586,336 @@ def import_csv_task(self, job_id: str):
             "message": "Starting CSV import..."
         })
         
-        # Stream and process CSV from database
-        import csv
-        import io
+        # Fan large files out to chunk tasks
+        if (
+            IMPORT_PARALLEL_CHUNKS > 1
+            and size >= IMPORT_PARALLEL_MIN_BYTES
+            and _dispatch_import_chunks(job_id, storage_key, size)
+        ):
+            return
+        
+        # Bulk-load settings for the import transaction: don't wait for the WAL
+        # flush on commit (a crash can at worst lose the final commit, leaving
+        # the job "running" for the client to retry; nothing is corrupted) and
+        # give the merge's sorts/hashes room to stay in memory
+        session.execute(text("SET LOCAL synchronous_commit = off"))
+        session.execute(text("SELECT set_config('work_mem', :work_mem, true)"), {"work_mem": IMPORT_WORK_MEM})
         
-        csv_reader = csv.DictReader(io.StringIO(import_job.csv_data))
+        # Parse staged CSV with pyarrow's streaming reader while it streams in
+        # from storage: tokenizing happens natively, one RecordBatch per block
+        # instead of one dict per row, and only a few blocks are in memory
+        skipped_rows = _SkippedRowCounter()
+        csv_reader = _open_csv_reader(iter_csv(storage_key) or iter(()), skipped_rows)
         
-        batch = []
         processed = 0
         total_inserted = 0
         total_updated = 0
         
-        for row in csv_reader:
-            # Check for cancellation every few rows
-            if processed % 100 == 0 and redis_client.get(f"cancel:{job_id}"):
+        for batch in _iter_import_batches(csv_reader):
+            # Check cancellation before each batch insert
+            if cancel_watcher.cancelled:
                 print(f"[Import] Job {job_id} cancelled at {processed} rows")
                 publish_progress(job_id, {
                     "status": "error",
                     "error": "Import cancelled by user",
-                    "message": f"Import cancelled after processing {processed:,} rows"
+                    "message": f"Import cancelled after processing {processed:,} rows, no products were changed"
                 })
                 session.rollback()
                 session.close()
+                delete_csv(storage_key)
                 return
             
-            # Extract and clean data
-            sku = clean_string(row.get('sku', ''), max_length=255)
-            if not sku:
-                continue  # Skip rows without SKU
-            
-            sku_ci = sku.lower()
-            name = clean_string(row.get('name', ''), max_length=1024)
-            description = clean_string(row.get('description', ''))
-            
-            # Parse price (optional)
-            price_str = row.get('price', '')
-            price = None
-            if price_str:
-                try:
-                    price = Decimal(str(safe_float(price_str)))
-                except:
-                    price = None
+            inserted, updated = _upsert_batch(session, batch)
+            total_inserted += inserted
+            total_updated += updated
+            processed += len(batch)
             
-            batch.append({
-                'sku': sku,
-                'sku_ci': sku_ci,
-                'name': name or sku,  # Default name to SKU if empty
-                'description': description,
-                'price': price,
-                'active': True
+            # Publish progress (Redis only: the whole import is one
+            # transaction, committed together with the final status)
+            publish_progress(job_id, {
+                "status": "processing",
+                "processed": processed,
+                "inserted": total_inserted,
+                "updated": total_updated,
+                "skipped": skipped_rows.count,
+                "percent": min(99, int(processed / 5000)),  # Rough estimate, max 99%
+                "message": f"Processed {processed:,} rows"
             })
             
-            # Process batch when size reached
-            if len(batch) >= IMPORT_BATCH_SIZE:
-                # Check cancellation before batch insert
-                if redis_client.get(f"cancel:{job_id}"):
-                    print(f"[Import] Job {job_id} cancelled before batch insert")
-                    session.rollback()
-                    session.close()
-                    return
-                
-                inserted, updated = _upsert_batch(session, batch)
-                total_inserted += inserted
-                total_updated += updated
-                processed += len(batch)
-                batch = []
-                
-                # Update job progress
-                session.execute(
-                    update(ImportJob)
-                    .where(ImportJob.id == job_id)
-                    .values(processed_rows=processed)
-                )
-                session.commit()
-                
-                # Publish progress with percentage (approximate based on file size would be better)
-                publish_progress(job_id, {
-                    "status": "processing",
-                    "processed": processed,
-                    "inserted": total_inserted,
-                    "updated": total_updated,
-                    "percent": min(99, int(processed / 5000)),  # Rough estimate, max 99%
-                    "message": f"Processed {processed:,} rows"
-                })
-                
-                print(f"[Import] Processed {processed} rows (batch size: {IMPORT_BATCH_SIZE})")
+            print(f"[Import] Processed {processed} rows (batch size: {IMPORT_BATCH_SIZE})")
         
-        # Final cancellation check
-        if redis_client.get(f"cancel:{job_id}"):
-            print(f"[Import] Job {job_id} cancelled before final batch")
-            session.rollback()
-            session.close()
+        # Mark job as completed and commit it together with every batch
+        _finish_import(session, job_id, storage_key, processed, total_inserted, total_updated, skipped_rows.count)
+            
+    except Exception as e:
+        _fail_import(session, job_id, e)
+        if storage_key:
+            delete_csv(storage_key)
+        raise
+    finally:
+        if cancel_watcher:
+            cancel_watcher.close()
+        session.close()
+
+
+@celery_app.task(bind=True, name="app.tasks.import_csv_chunk_task", ignore_result=True, acks_late=True)
+def import_csv_chunk_task(self, job_id: str, storage_key: str, header_end: int, start: int, end: int):
+    """
+    Import one byte range of a CSV split by import_csv_task
+    
+    Each batch commits on its own; job-wide totals are kept in a Redis hash
+    and the chunk that exits last marks the job completed (or only drops the
+    staged CSV if any chunk failed or was cancelled). A failing chunk fails
+    the job and raises the cancel flag so its siblings stop.
+    
+    Args:
+        job_id: UUID of the ImportJob record
+        storage_key: Location of the staged CSV
+        header_end: The header line is bytes [0, header_end)
+        start: First byte of this chunk's records
+        end: Stop before this byte
+    """
+    print(f"[Task] Importing bytes {start}-{end} of job {job_id}")
+    
+    session = SyncSessionLocal()
+    redis_client = get_sync_redis()
+    state_key = _chunk_state_key(job_id)
+    cancel_watcher = None
+    chunk_exited = False
+    state = None
+    
+    # Redelivered (acks_late) after this chunk, or the whole job, already exited
+    if any(redis_client.hmget(state_key, f"exited:{start}", "finished")):
+        print(f"[Import] Chunk {start}-{end} of job {job_id} already ran, skipping")
+        session.close()
+        return
+    
+    try:
+        cancel_watcher = CancelWatcher(redis_client, job_id)
+        if cancel_watcher.cancelled:
+            print(f"[Import] Job {job_id} was cancelled before chunk {start}-{end} started")
+            state = _chunk_exited(redis_client, state_key, start, stopped=True)
+            chunk_exited = True
+            if state is not None:
+                delete_csv(storage_key)
             return
         
-        # Process remaining rows
-        if batch:
-            inserted, updated = _upsert_batch(session, batch)
-            total_inserted += inserted
-            total_updated += updated
-            processed += len(batch)
+        header = iter_csv(storage_key, 0, header_end)
+        records = iter_csv(storage_key, start, end)
+        if header is None or records is None:
+            raise RuntimeError("No CSV data found (upload expired or missing)")
         
-        # Mark job as completed
-        session.execute(
-            update(ImportJob)
-            .where(ImportJob.id == job_id)
-            .values(
-                status="completed",
-                total_rows=processed,
-                processed_rows=processed
-            )
-        )
-        session.commit()
+        skipped_rows = _SkippedRowCounter()
+        csv_reader = _open_csv_reader(itertools.chain(header, records), skipped_rows)
+        counts = dict.fromkeys(CHUNK_COUNTERS, 0)
         
-        # Publish completion
-        publish_progress(job_id, {
-            "status": "complete",
-            "processed": processed,
-            "inserted": total_inserted,
-            "updated": total_updated,
-            "percent": 100,
-            "message": f"Import complete! Processed {processed:,} products ({total_inserted:,} new, {total_updated:,} updated)"
-        })
+        for batch in _iter_import_batches(csv_reader):
+            if cancel_watcher.cancelled:
+                print(f"[Import] Job {job_id} cancelled, stopping chunk {start}-{end}")
+                state = _chunk_exited(redis_client, state_key, start, stopped=True)
+                chunk_exited = True
+                if state is not None:
+                    delete_csv(storage_key)
+                return
+            
+            inserted, updated = _upsert_batch_committed(session, batch)
+            counts["processed"] += len(batch)
+            counts["inserted"] += inserted
+            counts["updated"] += updated
+            counts["skipped"] = skipped_rows.count
+            
+            # Overwrite (not increment) this chunk's counters, then sum all chunks
+            with redis_client.pipeline() as pipe:
+                pipe.hset(state_key, mapping={f"{counter}:{start}": value for counter, value in counts.items()})
+                pipe.hgetall(state_key)
+                _, chunk_state = pipe.execute()
+            totals = _chunk_totals(chunk_state)
+            
+            publish_progress(job_id, {
+                "status": "processing",
+                **totals,
+                "percent": min(99, int(totals["processed"] / 5000)),  # Rough estimate, max 99%
+                "message": f"Processed {totals['processed']:,} rows"
+            })
         
-        print(f"[Import] Completed successfully: {processed} rows processed")
+        # Last chunk to exit completes the job (or, if a sibling failed or was
+        # cancelled, just drops the staged CSV)
+        counts["skipped"] = skipped_rows.count
+        state = _chunk_exited(redis_client, state_key, start, counts=counts)
+        chunk_exited = True
+        if state is not None:
+            if state.get("stopped"):
+                delete_csv(storage_key)
+            else:
+                totals = _chunk_totals(state)
+                _finish_import(
+                    session, job_id, storage_key,
+                    totals["processed"], totals["inserted"], totals["updated"], totals["skipped"],
+                )
         
-        # Note: CSV data stored in database, no file cleanup needed
-            
     except Exception as e:
-        error_msg = str(e)
-        error_trace = traceback.format_exc()
-        
-        print(f"[Import] ERROR: {error_msg}")
-        print(error_trace)
+        _fail_import(session, job_id, e)
         
-        # Mark job as failed
+        # Stop the other chunks of this job
         try:
-            session.rollback()
-            session.execute(
-                update(ImportJob)
-                .where(ImportJob.id == job_id)
-                .values(
-                    status="failed",
-                    error=error_trace
-                )
-            )
-            session.commit()
-        except Exception as db_err:
-            print(f"[Import] Failed to update job status: {db_err}")
+            with redis_client.pipeline(transaction=False) as pipe:
+                pipe.setex(f"cancel:{job_id}", 300, "1")
+                pipe.publish(f"cancel:{job_id}", "1")
+                pipe.execute()
+        except redis.RedisError as redis_err:
+            print(f"[Import] Failed to stop sibling chunks: {redis_err}")
         
-        # Publish error
-        publish_progress(job_id, {
-            "status": "error",
-            "error": error_msg,
-            "message": f"Import failed: {error_msg}"
-        })
+        # Drop the staged CSV once every chunk has exited
+        if not chunk_exited:
+            try:
+                if _chunk_exited(redis_client, state_key, start, stopped=True) is not None:
+                    delete_csv(storage_key)
+            except redis.RedisError as redis_err:
+                print(f"[Import] Failed to record chunk exit: {redis_err}")
+        elif state is not None:
+            delete_csv(storage_key)  # Completing the job failed on the last chunk
         
         raise
     finally:
+        if cancel_watcher:
+            cancel_watcher.close()
         session.close()
 
 
-def _upsert_batch(session, batch: List[Dict[str, Any]]) -> tuple[int, int]:
+# COPY-based upsert: stream the batch into a temp staging table, then merge it
+# into products with one set-based INSERT ... ON CONFLICT. The staging table is
+# created once per connection and truncated per batch (all batches share the
+# import's transaction), so batches don't pay for creating and dropping it
+STAGING_COLUMNS = ("sku", "name", "description", "price", "active")
+
+_CREATE_STAGING_SQL = """
+    CREATE TEMP TABLE IF NOT EXISTS products_stage (
+        sku varchar(255) NOT NULL,
+        name varchar(1024) NOT NULL,
+        description text,
+        price numeric(10, 2),
+        active boolean NOT NULL
+    ) ON COMMIT DELETE ROWS
+"""
+
+_TRUNCATE_STAGING_SQL = "TRUNCATE products_stage"
+
+# CSV written by pyarrow: strings are always quoted, so an unquoted empty
+# field is a NULL and "" an empty string
+_COPY_STAGING_SQL = f"COPY products_stage ({', '.join(STAGING_COLUMNS)}) FROM STDIN WITH (FORMAT csv)"
+
+# Rows are merged in lower(sku) order so concurrent chunk imports lock
+# overlapping products in the same order.
+# xmax is 0 on a freshly inserted tuple and holds the updating transaction's
+# id when ON CONFLICT took the DO UPDATE path, so the merge can classify its
+# own rows; counting happens server-side instead of returning every row
+_MERGE_STAGING_SQL = """
+    WITH merged AS (
+        INSERT INTO products (sku, name, description, price, active)
+        SELECT sku, name, description, price, active FROM products_stage
+        ORDER BY lower(sku)
+        ON CONFLICT (lower(sku)) DO UPDATE SET
+            sku = EXCLUDED.sku,
+            name = EXCLUDED.name,
+            description = EXCLUDED.description,
+            price = EXCLUDED.price,
+            active = EXCLUDED.active,
+            updated_at = now()
+        RETURNING (xmax = 0) AS inserted
+    )
+    SELECT count(*) FILTER (WHERE inserted), count(*) FILTER (WHERE NOT inserted)
+    FROM merged
+"""
+
+
+def _dedupe_batch(batch: "pa.Table") -> "pa.Table":
+    """
+    Deduplicate batch case-insensitively by SKU (keep last occurrence);
+    ON CONFLICT can't touch the same row twice in one statement
     """
-    Upsert batch of products using PostgreSQL ON CONFLICT
+    pa, pc, pa_csv = _arrow()
+    
+    sku_ci = pc.utf8_lower(batch.column('sku'))
+    if pc.count_distinct(sku_ci).as_py() == batch.num_rows:
+        return batch
+    
+    last_rows = (
+        pa.table({'sku_ci': sku_ci, 'row': pa.array(range(batch.num_rows), pa.int64())})
+        .group_by('sku_ci')
+        .aggregate([('row', 'max')])
+    )
+    return batch.take(last_rows.column('row_max'))
+
+
+def _upsert_batch(session, batch: "pa.Table") -> tuple[int, int]:
+    """
+    Upsert batch of products using COPY into a staging table and a single
+    INSERT ... SELECT ... ON CONFLICT merge (in the caller's transaction,
+    nothing is committed here)
+    
+    The COPY payload is written by pyarrow's CSV writer straight from the
+    Arrow columns (no per-row or per-cell Python).
     
     Args:
         session: Sync Session
-        batch: List of product dicts
+        batch: Cleaned products table (STAGING_COLUMNS)
         
     Returns:
         Tuple of (inserted_count, updated_count)
     """
-    if not batch:
+    pa, pc, pa_csv = _arrow()
+    
+    if not batch.num_rows:
         return 0, 0
     
-    # Deduplicate batch by sku_ci (keep last occurrence)
-    seen = {}
-    for row in batch:
-        seen[row['sku_ci']] = row
-    deduped_batch = list(seen.values())
+    batch = _dedupe_batch(batch).select(list(STAGING_COLUMNS))
     
-    # Track inserted vs updated
-    skus_ci = [row['sku_ci'] for row in deduped_batch]
-    result = session.execute(
-        select(Product.sku_ci).where(Product.sku_ci.in_(skus_ci))
-    )
-    existing_skus = {row[0] for row in result.fetchall()}
-    
-    updated_count = len(existing_skus)
-    inserted_count = len(deduped_batch) - updated_count
-    
-    # Perform upsert
-    stmt = insert(Product).values(deduped_batch)
-    stmt = stmt.on_conflict_do_update(
-        index_elements=['sku_ci'],
-        set_={
-            'sku': stmt.excluded.sku,
-            'name': stmt.excluded.name,
-            'description': stmt.excluded.description,
-            'price': stmt.excluded.price,
-            'active': stmt.excluded.active,
-            'updated_at': text('now()')
-        }
-    )
+    # Serialize batch as CSV for COPY
+    sink = pa.BufferOutputStream()
+    pa_csv.write_csv(batch, sink, pa_csv.WriteOptions(include_header=False))
+    buffer = pa.BufferReader(sink.getvalue())
     
-    session.execute(stmt)
-    session.commit()
+    cursor = session.connection().connection.cursor()
+    try:
+        cursor.execute(_CREATE_STAGING_SQL)  # No-op after the first batch
+        cursor.execute(_TRUNCATE_STAGING_SQL)
+        cursor.copy_expert(_COPY_STAGING_SQL, buffer)
+        
+        # Merge and track inserted vs updated in the same statement
+        cursor.execute(_MERGE_STAGING_SQL)
+        inserted_count, updated_count = cursor.fetchone()
+    finally:
+        cursor.close()
     
     return inserted_count, updated_count
 
 
-@celery_app.task(bind=True, name="app.tasks.bulk_delete_task")
+def _upsert_batch_committed(session, batch: "pa.Table", attempts: int = 3) -> tuple[int, int]:
+    """
+    Upsert and commit one batch, retrying it if it deadlocks with another
+    chunk of the same import (the upsert is idempotent)
+    
+    Args:
+        session: Sync Session
+        batch: Cleaned products table (STAGING_COLUMNS)
+        attempts: Tries before giving up
+        
+    Returns:
+        Tuple of (inserted_count, updated_count)
+    """
+    for attempt in range(1, attempts + 1):
+        try:
+            counts = _upsert_batch(session, batch)
+            session.commit()
+            return counts
+        except psycopg2.errors.DeadlockDetected:
+            session.rollback()
+            if attempt == attempts:
+                raise
+            print(f"[Import] Batch deadlocked, retrying ({attempt}/{attempts})")
+
+
+@celery_app.task(bind=True, name="app.tasks.bulk_delete_task", ignore_result=True, acks_late=True)
 def bulk_delete_task(self, job_id: str = None):
     """
     Delete all products from database
@@ -315,8 +934,18 @@ def bulk_delete_task(self, job_id: str = None):
                 "message": "Deleting all products..."
             })
         
-        # Execute TRUNCATE for fast deletion
+        # TRUNCATE skips per-row index maintenance entirely, but needs an
+        # ACCESS EXCLUSIVE lock - fail fast instead of queueing every reader
+        # behind us while an import holds the table
+        session.execute(text("SET LOCAL lock_timeout = '5s'"))
         session.execute(text("TRUNCATE TABLE products RESTART IDENTITY CASCADE"))
+        
+        if job_id:
+            publish_progress(job_id, {
+                "status": "processing",
+                "message": "Products table truncated, committing..."
+            })
+        
         session.commit()
         
         print("[Bulk Delete] All products deleted successfully")
@@ -346,6 +975,45 @@ def bulk_delete_task(self, job_id: str = None):
         session.close()
 
 
+# Webhook HTTP client, shared by every send in a worker process so repeated
+# deliveries reuse keep-alive connections instead of a TCP/TLS handshake each.
+# Created lazily so each forked worker process opens its own sockets
+WEBHOOK_TIMEOUT = 10.0
+WEBHOOK_MAX_KEEPALIVE = 50
+WEBHOOK_MAX_CONNECTIONS = 100
+WEBHOOK_HEADERS = {
+    "Content-Type": "application/json",
+    "User-Agent": "ProductImporter-Webhook/1.0"
+}
+_webhook_client: Optional["httpx.Client"] = None
+_webhook_client_lock = threading.Lock()  # Webhook workers may run a thread pool
+
+
+def get_webhook_client() -> "httpx.Client":
+    """Get this worker process's pooled webhook HTTP client"""
+    global _webhook_client
+    with _webhook_client_lock:
+        if _webhook_client is None:
+            httpx = _httpx()
+            _webhook_client = httpx.Client(
+                timeout=WEBHOOK_TIMEOUT,
+                limits=httpx.Limits(
+                    max_keepalive_connections=WEBHOOK_MAX_KEEPALIVE,
+                    max_connections=WEBHOOK_MAX_CONNECTIONS,
+                ),
+                headers=WEBHOOK_HEADERS,
+            )
+        return _webhook_client
+
+
+@worker_process_shutdown.connect
+def _close_webhook_client(**kwargs):
+    global _webhook_client
+    if _webhook_client is not None:
+        _webhook_client.close()
+        _webhook_client = None
+
+
 @celery_app.task(bind=True, name="app.tasks.send_webhook_task")
 def send_webhook_task(self, webhook_id: int, event_type: str, payload: Dict[str, Any]):
     """
@@ -358,6 +1026,7 @@ def send_webhook_task(self, webhook_id: int, event_type: str, payload: Dict[str,
     """
     print(f"[Task] Sending webhook {webhook_id} for event {event_type}")
     
+    httpx = _httpx()
     session = SyncSessionLocal()
     
     try:
@@ -378,46 +1047,38 @@ def send_webhook_task(self, webhook_id: int, event_type: str, payload: Dict[str,
         # Send HTTP POST request
         start_time = time.time()
         
-        with httpx.Client(timeout=10.0) as client:
-            response = client.post(
-                webhook.url,
-                json=payload,
-                headers={
-                    "Content-Type": "application/json",
-                    "User-Agent": "ProductImporter-Webhook/1.0"
-                }
-            )
-            
-            response_time_ms = int((time.time() - start_time) * 1000)
-            status_code = response.status_code
-            response_text = response.text[:1000]  # Limit response text
-            
-            print(f"[Webhook] Sent to {webhook.url}, status: {status_code}, time: {response_time_ms}ms")
-            
-            # Update webhook last status
-            session.execute(
-                update(Webhook)
-                .where(Webhook.id == webhook_id)
-                .values(
-                    last_status=status_code,
-                    last_response=response_text,
-                    updated_at=text('now()')
-                )
-            )
-            
-            # Create webhook event log
-            event = WebhookEvent(
-                webhook_id=webhook_id,
-                event_type=event_type,
-                payload=payload,
-                status=status_code,
-                response_text=response_text,
-                response_time_ms=response_time_ms
+        response = get_webhook_client().post(webhook.url, json=payload)
+        
+        response_time_ms = int((time.time() - start_time) * 1000)
+        status_code = response.status_code
+        response_text = response.text[:1000]  # Limit response text
+        
+        print(f"[Webhook] Sent to {webhook.url}, status: {status_code}, time: {response_time_ms}ms")
+        
+        # Update webhook last status
+        session.execute(
+            update(Webhook)
+            .where(Webhook.id == webhook_id)
+            .values(
+                last_status=status_code,
+                last_response=response_text,
+                updated_at=text('now()')
             )
-            session.add(event)
-            
-            session.commit()
-            
+        )
+        
+        # Create webhook event log
+        event = WebhookEvent(
+            webhook_id=webhook_id,
+            event_type=event_type,
+            payload=payload,
+            status=status_code,
+            response_text=response_text,
+            response_time_ms=response_time_ms
+        )
+        session.add(event)
+        
+        session.commit()
+        
     except httpx.TimeoutException as e:
         error_msg = f"Timeout: {str(e)}"
         print(f"[Webhook] Timeout sending to webhook {webhook_id}: {error_msg}")
@@ -429,7 +1090,7 @@ def send_webhook_task(self, webhook_id: int, event_type: str, payload: Dict[str,
             payload=payload,
             status=0,
             response_text=error_msg,
-            response_time_ms=10000  # Timeout threshold
+            response_time_ms=int(WEBHOOK_TIMEOUT * 1000)  # Timeout threshold
         )
         session.add(event)
         session.commit()
@@ -454,3 +1115,119 @@ def send_webhook_task(self, webhook_id: int, event_type: str, payload: Dict[str,
         session.commit()
     finally:
         session.close()
+
+
+async def _post_webhooks(urls: Sequence[str], payload: Dict[str, Any]) -> List[Tuple[int, str, int]]:
+    """
+    POST the same payload to every URL concurrently over one AsyncClient
+    
+    Args:
+        urls: Webhook URLs
+        payload: JSON payload to send
+        
+    Returns:
+        (status, response_text, response_time_ms) per URL, in order; status is
+        0 when the request failed
+    """
+    httpx = _httpx()
+    
+    async with httpx.AsyncClient(
+        timeout=WEBHOOK_TIMEOUT,
+        limits=httpx.Limits(
+            max_keepalive_connections=WEBHOOK_MAX_KEEPALIVE,
+            max_connections=WEBHOOK_MAX_CONNECTIONS,
+        ),
+        headers=WEBHOOK_HEADERS,
+    ) as client:
+        async def post(url: str) -> Tuple[int, str, int]:
+            start_time = time.time()
+            try:
+                response = await client.post(url, json=payload)
+            except httpx.TimeoutException as e:
+                return 0, f"Timeout: {str(e)}", int(WEBHOOK_TIMEOUT * 1000)
+            except Exception as e:
+                return 0, str(e), 0
+            return response.status_code, response.text[:1000], int((time.time() - start_time) * 1000)
+        
+        return await asyncio.gather(*(post(url) for url in urls))
+
+
+@celery_app.task(bind=True, name="app.tasks.send_webhooks_batch_task", ignore_result=True)
+def send_webhooks_batch_task(
+    self,
+    event_type: str,
+    payload: Dict[str, Any],
+    webhook_ids: Optional[List[int]] = None,
+):
+    """
+    Send one event to many webhooks in a single task
+    
+    Webhooks are loaded with one SELECT, delivered concurrently, and their
+    statuses / event logs are written back in two bulk statements.
+    
+    Args:
+        event_type: Event type (e.g., 'import.completed')
+        payload: JSON payload to send
+        webhook_ids: Webhooks to notify (defaults to every enabled webhook
+            subscribed to event_type)
+    """
+    session = SyncSessionLocal()
+    
+    try:
+        query = select(Webhook.id, Webhook.url).where(Webhook.enabled.is_(True))
+        if webhook_ids is not None:
+            query = query.where(Webhook.id.in_(webhook_ids))
+        else:
+            query = query.where(Webhook.event == event_type)
+        webhooks = session.execute(query).all()
+        
+        if not webhooks:
+            print(f"[Webhook] No enabled webhooks for event {event_type}")
+            return
+        
+        print(f"[Task] Sending event {event_type} to {len(webhooks)} webhooks")
+        results = asyncio.run(_post_webhooks([webhook.url for webhook in webhooks], payload))
+        
+        # Update webhook last status (only for webhooks that answered)
+        statuses = [
+            {"webhook_id": webhook.id, "status": status, "response_text": response_text}
+            for webhook, (status, response_text, _) in zip(webhooks, results)
+            if status
+        ]
+        if statuses:
+            # Core executemany (on the session's connection) so updated_at can
+            # be set server-side like the single-webhook path does
+            session.connection().execute(
+                update(Webhook.__table__)
+                .where(Webhook.__table__.c.id == bindparam("webhook_id"))
+                .values(
+                    last_status=bindparam("status"),
+                    last_response=bindparam("response_text"),
+                    updated_at=func.now(),
+                ),
+                statuses,
+            )
+        
+        # Create webhook event logs
+        session.execute(insert(WebhookEvent), [
+            {
+                "webhook_id": webhook.id,
+                "event_type": event_type,
+                "payload": payload,
+                "status": status,
+                "response_text": response_text,
+                "response_time_ms": response_time_ms,
+            }
+            for webhook, (status, response_text, response_time_ms) in zip(webhooks, results)
+        ])
+        session.commit()
+        
+        print(f"[Webhook] Event {event_type} delivered to {len(statuses)}/{len(webhooks)} webhooks")
+        
+    except Exception as e:
+        print(f"[Webhook] ERROR sending event {event_type}: {str(e)}")
+        print(traceback.format_exc())
+        session.rollback()
+        raise
+    finally:
+        session.close()
@@ -5,67 +5,120 @@
 # - Webhook HTTP client
 
 import csv
-import json
+import logging
 import os
 from typing import AsyncGenerator, Dict, Any, Optional
+import orjson
 import redis.asyncio as aioredis
 import redis
 
+from app.progress import ProgressBatcher, ThreadedProgressBatcher
+
+logger = logging.getLogger(__name__)
+
 # Redis clients
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONN", "50"))
+REDIS_BLOCKING_MAX_CONNECTIONS = int(os.getenv("REDIS_BLOCKING_MAX_CONN", "500"))
+
+# Connection pools are created once per process so every publish/GET reuses
+# an open socket instead of paying a TCP (+AUTH) handshake per call
+sync_redis_pool = redis.ConnectionPool.from_url(
+    REDIS_URL,
+    max_connections=REDIS_MAX_CONNECTIONS,
+    decode_responses=True,
+)
+
+# Async pools are split so long-lived pub/sub reads (SSE) can never starve
+# short commands (SETEX, PUBLISH, GET):
+# - general: short socket timeout, and callers wait at most 0.5s for a free
+#   connection instead of queueing behind a saturated pool
+# - blocking: pub/sub subscriptions, no socket timeout (reads idle until a
+#   message arrives), sized to the expected number of concurrently watched jobs;
+#   returns raw bytes so SSE can forward messages without re-encoding
+async_redis_pool = aioredis.BlockingConnectionPool.from_url(
+    REDIS_URL,
+    max_connections=REDIS_MAX_CONNECTIONS,
+    timeout=0.5,
+    socket_timeout=2,
+    decode_responses=True,
+    encoding="utf-8",
+)
+async_blocking_redis_pool = aioredis.ConnectionPool.from_url(
+    REDIS_URL,
+    max_connections=REDIS_BLOCKING_MAX_CONNECTIONS,
+    socket_timeout=None,
+)
 
 # Sync Redis client for Celery tasks
-sync_redis_client = redis.from_url(REDIS_URL, decode_responses=True)
+sync_redis_client = redis.Redis(connection_pool=sync_redis_pool)
 
-# Async Redis client for FastAPI
-async_redis_client = None
+# Progress statuses that end a job; published immediately rather than batched
+FINAL_PROGRESS_STATUSES = frozenset({"complete", "error", "cancelled"})
 
 
 async def get_async_redis():
-    """Get or create async Redis client"""
-    global async_redis_client
-    if async_redis_client is None:
-        async_redis_client = await aioredis.from_url(
-            REDIS_URL,
-            decode_responses=True,
-            encoding="utf-8"
-        )
-    return async_redis_client
+    """Get async Redis client backed by the general (short command) pool"""
+    return aioredis.Redis(connection_pool=async_redis_pool)
+
+
+async def get_blocking_redis():
+    """Get async Redis client for pub/sub and other long blocking reads"""
+    return aioredis.Redis(connection_pool=async_blocking_redis_pool)
+
+
+# Coalesces progress publishes from the API process (started in app.main lifespan)
+progress_batcher = ProgressBatcher(get_async_redis)
+
+# Coalesces progress publishes from Celery tasks (flush thread starts on first use)
+sync_progress_batcher = ThreadedProgressBatcher(lambda: sync_redis_client)
 
 
 def publish_progress(job_id: str, data: Dict[str, Any]) -> None:
     """
     Publish progress update to Redis channel (sync version for Celery tasks)
     
+    Intermediate updates are queued and pipelined by a background thread;
+    final statuses flush the queue before returning
+    
     Args:
         job_id: Import job UUID
         data: Progress data dict (status, processed, total, etc.)
     """
     channel = f"job:{job_id}"
-    message = json.dumps(data)
+    message = orjson.dumps(data)  # bytes; redis-py publishes them as-is
     
-    try:
-        sync_redis_client.publish(channel, message)
-        print(f"[Redis Pub/Sub] Published to {channel}: {message}")
-    except Exception as e:
-        print(f"[Redis Pub/Sub] Error publishing: {e}")
+    final = data.get("status") in FINAL_PROGRESS_STATUSES
+    sync_progress_batcher.publish(channel, message, flush=final)
+    # Per-message stdout writes would put a blocking print back in the import loop
+    if final:
+        print(f"[Redis Pub/Sub] Published final status to {channel}: {message.decode()}")
+    else:
+        logger.debug("[Redis Pub/Sub] Queued for %s: %s", channel, message)
 
 
 async def publish_progress_async(job_id: str, data: Dict[str, Any]) -> None:
     """
     Async version of publish_progress for FastAPI/async contexts
     
+    Messages are queued on the shared ProgressBatcher and flushed to Redis in
+    pipelined batches (falls back to a direct PUBLISH if the batcher isn't running)
+    
     Args:
         job_id: Import job UUID
         data: Progress data dict
     """
     channel = f"job:{job_id}"
-    message = json.dumps(data)
+    message = orjson.dumps(data)  # bytes; redis-py publishes them as-is
+    
+    if progress_batcher.running:
+        progress_batcher.publish(channel, message)
+        return
     
     try:
-        redis_client = await get_async_redis()
-        await redis_client.publish(channel, message)
-        print(f"[Redis Pub/Sub] Published to {channel}: {message}")
+        async with await get_async_redis() as redis_client:
+            await redis_client.publish(channel, message)
+        print(f"[Redis Pub/Sub] Published to {channel}: {message.decode()}")
     except Exception as e:
         print(f"[Redis Pub/Sub] Error publishing: {e}")
 